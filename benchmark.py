@@ -0,0 +1,749 @@
+"""
+Benchmarks for task_manager.py, run from the command line, e.g.
+
+    python benchmark.py memory --tasks 1000000
+    python benchmark.py parse --tasks 1000000
+    python benchmark.py stress --writers 8 --operations 200
+    python benchmark.py login --iterations 600000 --logins 20
+    python benchmark.py reports --tasks 1000000 --workers 1 2 4 8
+    python benchmark.py scan --tasks 1000000
+    python benchmark.py render --tasks 50000
+    python benchmark.py search --tasks 1000000
+    python benchmark.py suite --sizes 1000 100000 1000000 -o results.json
+    python benchmark.py compare old.json new.json
+"""
+# ===== Importing external modules ===========
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import task_manager
+
+
+# ===== Data Generation =====
+def generate_lines(task_count, user_count=20, seed=0, completion_ratio=0.5,
+                   overdue_ratio=0.25):
+    """
+    Function that yields task file lines for randomly generated tasks.
+    Due dates are spread around today so that the given shares of tasks
+    are complete and overdue; on the same day, the same seed always
+    gives the same tasks.
+
+    Args:
+        task_count (int): The number of tasks to generate
+        user_count (int): The number of distinct users to assign
+        seed (int): The random seed
+        completion_ratio (float): The share of tasks that are complete
+        overdue_ratio (float): The share of tasks that are incomplete and
+            past their due date
+    """
+    generator = random.Random(seed)
+    today = datetime.date.today().toordinal()
+    users = [f"user{number}" for number in range(user_count)]
+    for task_id in range(1, task_count + 1):
+        kind = generator.random()
+        if kind < completion_ratio:
+            completion = "Yes"
+            due = today + generator.randrange(-365, 365)
+        elif kind < completion_ratio + overdue_ratio:
+            completion = "No"
+            due = today - generator.randrange(1, 365)
+        else:
+            completion = "No"
+            due = today + generator.randrange(0, 365)
+        created = due - generator.randrange(1, 120)
+        yield ", ".join([
+            generator.choice(users),
+            f"Task {task_id}",
+            f"Generated task number {task_id} for benchmarking.",
+            task_manager.date_str(datetime.date.fromordinal(due)),
+            task_manager.date_str(datetime.date.fromordinal(created)),
+            completion,
+            str(task_id),
+        ])
+
+
+def write_task_file(filename, task_count, user_count=20, seed=0,
+                    completion_ratio=0.5, overdue_ratio=0.25):
+    """
+    Function that writes a task file of randomly generated tasks (see
+    generate_lines).
+    """
+    with open(filename, "w", encoding="utf-8") as task_file:
+        task_file.write("\n".join(generate_lines(
+            task_count, user_count, seed, completion_ratio, overdue_ratio)))
+
+
+def write_user_file(filename, user_count=20, iterations=None):
+    """
+    Function that writes a user file with the admin and the generated
+    users (see generate_lines). Every password is "password", hashed
+    once with the given work factor and shared, so large user files are
+    quick to write.
+    """
+    stored = task_manager.hash_password("password", iterations)
+    with open(filename, "w", encoding="utf-8") as user_file:
+        user_file.write("\n".join(
+            f"{name}, {stored}" for name in
+            ["admin"] + [f"user{number}" for number in range(user_count)]))
+
+
+def generate_tasks(task_count, user_count=20, seed=0):
+    """
+    Function that returns a list of randomly generated task objects.
+    """
+    tasks = []
+    for line in generate_lines(task_count, user_count, seed):
+        detail = line.split(", ")
+        tasks.append(task_manager.Task(
+            detail[0], detail[1], detail[2],
+            datetime.datetime.strptime(detail[3], "%d %b %Y"),
+            datetime.datetime.strptime(detail[4], "%d %b %Y"),
+            detail[5], int(detail[6])))
+    return tasks
+
+
+# ===== Benchmarks =====
+def bench_memory(args):
+    """
+    Function that reports the memory used by task objects and by the
+    same tasks in columnar storage.
+    """
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    tasks = generate_tasks(args.tasks)
+    task_bytes = tracemalloc.get_traced_memory()[0] - start
+    columns = task_manager.TaskColumns(tasks)
+    del tasks
+    column_bytes = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del columns
+
+    print(f"Tasks: {args.tasks}")
+    print(f"Task objects: {task_bytes / 2**20:.1f} MB "
+          f"({task_bytes / args.tasks:.0f} bytes per task)")
+    print(f"Task columns: {column_bytes / 2**20:.1f} MB "
+          f"({column_bytes / args.tasks:.0f} bytes per task)")
+
+
+def strptime_parse(filename):
+    """
+    Function that parses a task file the way get_tasks() did before the
+    date cache, calling strptime for both dates on every line.
+    """
+    tasks = []
+    with open(filename, "r", encoding="utf-8") as tasks_file:
+        for line in tasks_file:
+            detail = line.strip("\n").split(", ")
+            due = datetime.datetime.strptime(detail[3], "%d %b %Y")
+            created = datetime.datetime.strptime(detail[4], "%d %b %Y")
+            tasks.append(task_manager.Task(detail[0], detail[1], detail[2],
+                                           due, created, detail[5],
+                                           int(detail[6])))
+    return tasks
+
+
+def bench_parse(args):
+    """
+    Function that compares parsing a task file with strptime against
+    get_tasks() and its cached date parser.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "tasks.txt")
+        write_task_file(filename, args.tasks)
+
+        started = time.perf_counter()
+        baseline = strptime_parse(filename)
+        strptime_seconds = time.perf_counter() - started
+        del baseline
+
+        task_manager.parse_date.cache_clear()
+        started = time.perf_counter()
+        tasks = task_manager.get_tasks(filename)
+        cached_seconds = time.perf_counter() - started
+
+    print(f"Tasks: {len(tasks)}")
+    print(f"Distinct dates: {task_manager.parse_date.cache_info().currsize}")
+    print(f"strptime parse: {strptime_seconds:.2f}s")
+    print(f"cached parse:   {cached_seconds:.2f}s "
+          f"({strptime_seconds / cached_seconds:.1f}x faster)")
+
+
+def open_stress_store(directory):
+    """
+    Function that returns a task store for the stress test files, with a
+    small journal so compactions happen during the test.
+    """
+    return task_manager.TaskStore(os.path.join(directory, "tasks.txt"),
+                                  os.path.join(directory, "tasks_journal.txt"),
+                                  compact_threshold=4096)
+
+
+def stress_writer(directory, writer, operations):
+    """
+    Function run by each stress test process. It adds tasks, reassigns
+    each to its own user and completes every second one, with each step
+    saved as a separate write.
+    """
+    store = open_stress_store(directory)
+    today = datetime.date.today().toordinal()
+    for number in range(operations):
+        task = task_manager.Task("admin", f"writer {writer} task {number}",
+                                 "Stress test task.", today, today, "No")
+        store.add(task)
+        store.reassign(task, f"user{writer}")
+        if number % 2 == 0:
+            store.complete(task)
+
+
+def bench_stress(args):
+    """
+    Function that runs many writer processes against the same task files
+    at once and checks that no update was lost.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        open(os.path.join(directory, "tasks.txt"), "w").close()
+        processes = [multiprocessing.Process(
+            target=stress_writer, args=(directory, writer, args.operations))
+            for writer in range(args.writers)]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        seconds = time.perf_counter() - started
+        tasks = open_stress_store(directory).get_all()
+
+    writes = args.writers * args.operations * 2.5
+    print(f"Writers: {args.writers}, writes: {writes:.0f} "
+          f"in {seconds:.2f}s ({writes / seconds:.0f} writes/s)")
+    lost = []
+    by_title = {task.title: task for task in tasks}
+    if len(by_title) != len(tasks) or len({task.get_id() for task in tasks}) \
+            != len(tasks):
+        lost.append("duplicate tasks or task IDs")
+    for writer in range(args.writers):
+        for number in range(args.operations):
+            task = by_title.get(f"writer {writer} task {number}")
+            if task is None:
+                lost.append(f"writer {writer} task {number} is missing")
+            elif task.user != f"user{writer}":
+                lost.append(f"writer {writer} task {number} lost its "
+                            f"reassignment")
+            elif task.is_complete() != (number % 2 == 0):
+                lost.append(f"writer {writer} task {number} has the wrong "
+                            f"completion status")
+    if any(process.exitcode != 0 for process in processes):
+        lost.append("a writer process failed")
+    for problem in lost[:20]:
+        print(problem)
+    print("FAILED: updates were lost." if lost else "OK: no updates lost.")
+    return 1 if lost else 0
+
+
+def bench_login(args):
+    """
+    Function that reports login throughput with plain text passwords and
+    with password hashes at the given work factor, and the cost of
+    looking up users with and without the cached user registry.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        user_file = os.path.join(directory, "user.txt")
+        with open(user_file, "w", encoding="utf-8") as users:
+            users.write("\n".join(f"user{number}, password{number}"
+                                  for number in range(args.users)))
+        store = task_manager.TaskStore(os.path.join(directory, "tasks.txt"),
+                                       user_file=user_file)
+
+        started = time.perf_counter()
+        for number in range(args.lookups):
+            task_manager.get_users(user_file)
+        reread_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        for number in range(args.lookups):
+            store.get_users()
+        cached_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for number in range(args.logins):
+            task_manager.check_password("password0", "password0")
+        plain_seconds = time.perf_counter() - started
+        stored = task_manager.hash_password("password0", args.iterations)
+        started = time.perf_counter()
+        for number in range(args.logins):
+            task_manager.check_password(stored, "password0")
+        hashed_seconds = time.perf_counter() - started
+
+    print(f"Users: {args.users}")
+    print(f"User lookups, re-reading the file: "
+          f"{args.lookups / reread_seconds:.0f}/s")
+    print(f"User lookups, cached registry:     "
+          f"{args.lookups / cached_seconds:.0f}/s")
+    print(f"Logins, plain text:                "
+          f"{args.logins / plain_seconds:.0f}/s")
+    label = f"Logins, PBKDF2 x {args.iterations}:"
+    print(f"{label:<35}{args.logins / hashed_seconds:.1f}/s "
+          f"({hashed_seconds / args.logins * 1000:.0f} ms each)")
+
+
+def bench_reports(args):
+    """
+    Function that compares the time to count the report totals of a task
+    file in one process and with parallel workers, checking that every
+    worker count gives the same task overview.
+    """
+    now = datetime.datetime.now()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "tasks.txt")
+        write_task_file(filename, args.tasks)
+        for workers in args.workers:
+            started = time.perf_counter()
+            if workers == 1:
+                stats = task_manager.TaskStats(
+                    task_manager.iter_tasks(filename), now)
+            else:
+                stats = task_manager.parallel_stats(filename, None, workers,
+                                                    now)
+            seconds = time.perf_counter() - started
+            batch = task_manager.AtomicBatch()
+            task_manager.task_overview(batch, stats)
+            results.append((workers, seconds, batch.writes,
+                            sorted(stats.users.items())))
+
+    print(f"Tasks: {args.tasks}, CPUs: {os.cpu_count()}")
+    baseline = results[0][1]
+    for workers, seconds, _, _ in results:
+        print(f"{workers:>3} workers: {seconds:.2f}s "
+              f"({baseline / seconds:.2f}x)")
+    if any(result[2:] != results[0][2:] for result in results):
+        print("FAILED: the reports differ between worker counts.")
+        return 1
+    print("OK: the reports are identical.")
+    return 0
+
+
+def bench_scan(args):
+    """
+    Function that compares answering a count and building the report
+    counters by parsing every task with get_tasks() against reading the
+    memory-mapped task file in place.
+    """
+    now = datetime.datetime.now()
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "tasks.txt")
+        write_task_file(filename, args.tasks)
+
+        started = time.perf_counter()
+        parsed_count = sum(1 for task in task_manager.filter_tasks(
+            task_manager.get_tasks(filename), user="user3", completed=False,
+            now=now))
+        parsed_count_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        with task_manager.TaskFile(filename) as task_file:
+            mapped_count = task_file.count(user="user3", completed=False,
+                                           now=now)
+        mapped_count_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        parsed_stats = task_manager.TaskStats(task_manager.get_tasks(filename),
+                                              now)
+        parsed_stats_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        mapped_stats = task_manager.file_stats(filename, now=now)
+        mapped_stats_seconds = time.perf_counter() - started
+
+    print(f"Tasks: {args.tasks}")
+    print(f"Incomplete tasks of one user, parsed: {parsed_count_seconds:.2f}s")
+    print(f"Incomplete tasks of one user, mapped: {mapped_count_seconds:.2f}s "
+          f"({parsed_count_seconds / mapped_count_seconds:.1f}x faster)")
+    print(f"Report counters, parsed: {parsed_stats_seconds:.2f}s")
+    print(f"Report counters, mapped: {mapped_stats_seconds:.2f}s "
+          f"({parsed_stats_seconds / mapped_stats_seconds:.1f}x faster)")
+    if (parsed_count != mapped_count
+            or parsed_stats.users != mapped_stats.users):
+        print("FAILED: the mapped reader gave different results.")
+        return 1
+    print("OK: the results are identical.")
+    return 0
+
+
+class CountingOutput:
+    """
+    A line-buffered stand-in for the terminal that discards the output
+    and counts how many writes reach it.
+    """
+    def __init__(self):
+        """
+        Initialise a counting output object.
+        """
+        self.output = open(os.devnull, "w", encoding="utf-8", buffering=1)
+        self.writes = 0
+        self.text = []
+
+    def write(self, text):
+        """
+        Function that counts a write and passes it on.
+        """
+        self.writes += 1
+        self.text.append(text)
+        return self.output.write(text)
+
+    def flush(self):
+        """
+        Function that flushes the output.
+        """
+        self.output.flush()
+
+    def close(self):
+        """
+        Function that closes the output.
+        """
+        self.output.close()
+
+
+def split_display_task(task_object):
+    """
+    Function that displays a task the way the views did before
+    paging, splitting its string form and printing each line.
+    """
+    task_details = str(task_object).split(", ")
+    print("\u2500"*50)
+    label = ["Task:", "Assigned to:", "Date assigned:", "Due date:",
+             "Task complete?", "Task Description:"]
+    print(f"{label[0]:<20}{task_details[1]}")
+    print(f"{label[1]:<20}{task_details[0]}")
+    print(f"{label[2]:<20}{task_details[4]}")
+    print(f"{label[3]:<20}{task_details[3]}")
+    print(f"{label[4]:<20}{task_details[5]}")
+    print(f"{label[5]}\n  {task_details[2]}")
+    print("\u2500"*50)
+
+
+def bench_render(args):
+    """
+    Function that compares displaying tasks one print per line against
+    formatting each page into one write.
+    """
+    tasks = generate_tasks(args.tasks)
+    results = []
+    for name in ("print per line", "page buffers"):
+        output = CountingOutput()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            if name == "print per line":
+                for task in tasks:
+                    split_display_task(task)
+            else:
+                for first in range(0, len(tasks), args.page_size):
+                    output.write(task_manager.format_page(
+                        tasks[first:first + args.page_size], first))
+                    output.flush()
+        results.append((name, time.perf_counter() - started, output.writes,
+                        "".join(output.text)))
+        output.close()
+
+    print(f"Tasks: {args.tasks}, page size: {args.page_size}")
+    for name, seconds, writes, _ in results:
+        print(f"{name:<15} {seconds:.2f}s, {writes} writes "
+              f"({results[0][1] / seconds:.1f}x)")
+    if results[0][3] != results[1][3]:
+        print("FAILED: the output differs.")
+        return 1
+    print("OK: the output is identical.")
+    return 0
+
+
+def bench_search(args):
+    """
+    Function that compares keyword searches of a new task store, as the
+    menus and the HTTP API use it, against streaming the task file for
+    each search. The first search loads the store and builds the word
+    index; the rest use the index.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "tasks.txt")
+        write_task_file(filename, args.tasks)
+        store = task_manager.TaskStore(filename)
+
+        generator = random.Random(1)
+        queries = [f"task {generator.randrange(1, args.tasks + 1)}"
+                   for _ in range(args.searches)]
+        started = time.perf_counter()
+        indexed = [[task.get_id() for task in
+                    store.iter_tasks(keywords=queries[0], user="user3")]]
+        first_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        indexed += [[task.get_id() for task in
+                     store.iter_tasks(keywords=query, user="user3")]
+                    for query in queries[1:]]
+        indexed_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        scanned = [[task.get_id() for task in
+                    task_manager.iter_tasks(filename, keywords=query,
+                                            user="user3")]
+                   for query in queries]
+        scanned_seconds = time.perf_counter() - started
+
+    print(f"Tasks: {args.tasks}")
+    print(f"First search, loading the store and building the word index: "
+          f"{first_seconds:.2f}s ({len(store.by_token)} distinct words)")
+    print(f"Indexed search: "
+          f"{indexed_seconds / max(1, args.searches - 1) * 1000:.3f} ms "
+          f"per search")
+    print(f"Full scan:      {scanned_seconds / args.searches * 1000:.1f} ms "
+          f"per search")
+    if indexed != scanned:
+        print("FAILED: the search results differ.")
+        return 1
+    print("OK: the search results are identical.")
+    return 0
+
+
+def suite_operations(directory):
+    """
+    Function that returns the suite's operations as (name, prepare)
+    pairs. Each prepare function sets up fresh state in the directory and
+    returns the function to measure.
+    """
+    filename = os.path.join(directory, "tasks.txt")
+    journal_file = os.path.join(directory, "tasks_journal.txt")
+    user_file = os.path.join(directory, "user.txt")
+    edits = 100
+
+    def open_store():
+        return task_manager.TaskStore(filename, journal_file,
+                                      user_file=user_file)
+
+    def loaded_store():
+        store = open_store()
+        store.get_all()
+        return store
+
+    def prepare_get_tasks():
+        return lambda: task_manager.get_tasks(filename)
+
+    def prepare_load():
+        return open_store().get_all
+
+    def prepare_complete():
+        store = loaded_store()
+        tasks = store.get_all()[-edits:]
+        return lambda: [store.complete(task) for task in tasks]
+
+    def prepare_compact():
+        return loaded_store().compact
+
+    def prepare_delete():
+        store = loaded_store()
+        tasks = store.get_all()[:edits]
+        return lambda: [store.delete(task) for task in tasks]
+
+    def prepare_user_overview():
+        # like the first report of a new session
+        task_manager.task_store = open_store()
+        return lambda: task_manager.user_overview(task_manager.AtomicBatch())
+
+    def prepare_search():
+        # like the first search of a new session
+        store = open_store()
+        return lambda: list(store.iter_tasks(keywords="task 12345",
+                                             user="user3"))
+
+    def prepare_login():
+        store = open_store()
+        store.get_users()
+        return lambda: store.verify_user("user3", "password")
+
+    return [("get_tasks", prepare_get_tasks),
+            ("load store", prepare_load),
+            (f"complete {edits}", prepare_complete),
+            ("compact", prepare_compact),
+            (f"delete {edits}", prepare_delete),
+            ("user_overview", prepare_user_overview),
+            ("first search", prepare_search),
+            ("login", prepare_login)]
+
+
+def bench_suite(args):
+    """
+    Function that measures the time and peak memory of the main task
+    manager operations at each task file size, and saves the results as
+    JSON so that versions can be compared.
+    """
+    results = []
+    previous_store = task_manager.task_store
+    previous_iterations = task_manager.PASSWORD_ITERATIONS
+    # so logins check the generated hashes without upgrading them
+    task_manager.PASSWORD_ITERATIONS = args.iterations
+    try:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                write_task_file(os.path.join(directory, "tasks.txt"), size,
+                                args.users, args.seed, args.completion_ratio,
+                                args.overdue_ratio)
+                write_user_file(os.path.join(directory, "user.txt"),
+                                args.users, args.iterations)
+                for name, prepare in suite_operations(directory):
+                    run = prepare()
+                    started = time.perf_counter()
+                    run()
+                    seconds = time.perf_counter() - started
+                    peak = None
+                    if not args.no_memory:
+                        # measured in a second run, as tracing slows it down
+                        run = prepare()
+                        tracemalloc.start()
+                        run()
+                        peak = tracemalloc.get_traced_memory()[1]
+                        tracemalloc.stop()
+                    results.append({"tasks": size, "operation": name,
+                                    "seconds": round(seconds, 6),
+                                    "peak_bytes": peak})
+                    memory = (f", peak {peak / 2**20:.1f} MB"
+                              if peak is not None else "")
+                    print(f"{size:>9} tasks  {name:<15} {seconds:9.4f}s"
+                          f"{memory}")
+    finally:
+        task_manager.task_store = previous_store
+        task_manager.PASSWORD_ITERATIONS = previous_iterations
+
+    report = {"label": args.label,
+              "created": datetime.datetime.now().isoformat(),
+              "python": sys.version.split()[0],
+              "config": {"users": args.users, "seed": args.seed,
+                         "completion_ratio": args.completion_ratio,
+                         "overdue_ratio": args.overdue_ratio,
+                         "password_iterations": args.iterations},
+              "results": results}
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+def bench_compare(args):
+    """
+    Function that compares two saved suite results, showing how much
+    slower or faster each operation became.
+    """
+    reports = []
+    for filename in (args.old, args.new):
+        with open(filename, "r", encoding="utf-8") as results:
+            reports.append(json.load(results))
+    old = {(result["tasks"], result["operation"]): result
+           for result in reports[0]["results"]}
+    print(f"{reports[0]['label'] or args.old} -> "
+          f"{reports[1]['label'] or args.new}")
+    slower = 0
+    for result in reports[1]["results"]:
+        before = old.get((result["tasks"], result["operation"]))
+        if before is None:
+            continue
+        ratio = result["seconds"] / max(before["seconds"], 1e-9)
+        flag = ""
+        if ratio > 1 + args.threshold:
+            flag = "  SLOWER"
+            slower += 1
+        print(f"{result['tasks']:>9} tasks  {result['operation']:<15} "
+              f"{before['seconds']:9.4f}s -> {result['seconds']:9.4f}s "
+              f"({ratio:.2f}x){flag}")
+    return 1 if slower else 0
+
+
+def main():
+    """
+    Function that parses the command line and runs a benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    memory = commands.add_parser("memory", help="memory used per task")
+    memory.add_argument("--tasks", type=int, default=1_000_000)
+    memory.set_defaults(run=bench_memory)
+
+    parse = commands.add_parser("parse", help="task file parse time")
+    parse.add_argument("--tasks", type=int, default=1_000_000)
+    parse.set_defaults(run=bench_parse)
+
+    stress = commands.add_parser(
+        "stress", help="concurrent writers, checking no update is lost")
+    stress.add_argument("--writers", type=int, default=8)
+    stress.add_argument("--operations", type=int, default=200)
+    stress.set_defaults(run=bench_stress)
+
+    login = commands.add_parser(
+        "login", help="login throughput at a password hash work factor")
+    login.add_argument("--iterations", type=int,
+                       default=task_manager.PASSWORD_ITERATIONS)
+    login.add_argument("--logins", type=int, default=20)
+    login.add_argument("--users", type=int, default=1000)
+    login.add_argument("--lookups", type=int, default=10_000)
+    login.set_defaults(run=bench_login)
+
+    reports = commands.add_parser(
+        "reports", help="report counting time by number of processes")
+    reports.add_argument("--tasks", type=int, default=1_000_000)
+    reports.add_argument("--workers", type=int, nargs="+",
+                         default=[1, 2, 4, 8])
+    reports.set_defaults(run=bench_reports)
+
+    scan = commands.add_parser(
+        "scan", help="counts from parsed tasks and the mapped file")
+    scan.add_argument("--tasks", type=int, default=1_000_000)
+    scan.set_defaults(run=bench_scan)
+
+    render = commands.add_parser(
+        "render", help="task display time, per line and per page")
+    render.add_argument("--tasks", type=int, default=50_000)
+    render.add_argument("--page-size", type=int, default=100)
+    render.set_defaults(run=bench_render)
+
+    search = commands.add_parser(
+        "search", help="keyword search time, indexed and scanned")
+    search.add_argument("--tasks", type=int, default=1_000_000)
+    search.add_argument("--searches", type=int, default=20)
+    search.set_defaults(run=bench_search)
+
+    suite = commands.add_parser(
+        "suite", help="time and peak memory of the main operations")
+    suite.add_argument("--sizes", type=int, nargs="+",
+                       default=[1000, 100_000, 1_000_000])
+    suite.add_argument("--users", type=int, default=20)
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--completion-ratio", type=float, default=0.5)
+    suite.add_argument("--overdue-ratio", type=float, default=0.25)
+    suite.add_argument("--iterations", type=int,
+                       default=task_manager.PASSWORD_ITERATIONS,
+                       help="password hash work factor")
+    suite.add_argument("--no-memory", action="store_true",
+                       help="skip the slower peak memory runs")
+    suite.add_argument("--label", default="",
+                       help="a name for this version in the results")
+    suite.add_argument("-o", "--output", default="benchmark_results.json")
+    suite.set_defaults(run=bench_suite)
+
+    compare = commands.add_parser(
+        "compare", help="compare two saved suite results")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=0.2,
+                         help="slowdown share flagged as a regression")
+    compare.set_defaults(run=bench_compare)
+
+    args = parser.parse_args()
+    started = time.perf_counter()
+    status = args.run(args)
+    print(f"Finished in {time.perf_counter() - started:.2f}s")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
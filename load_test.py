@@ -0,0 +1,129 @@
+"""
+A load test for server.py, run from the command line against a running
+server, e.g.
+
+    python server.py --port 8000 &
+    python load_test.py --port 8000 --clients 50 --requests 20000
+
+Each client keeps one connection open and sends requests one after
+another. By default they only read; --writes sets the share of requests
+that modify tasks instead.
+"""
+# ===== Importing external modules ===========
+import argparse
+import asyncio
+import base64
+import json
+import random
+import sys
+import time
+
+
+# ===== Client Functions =====
+async def request(reader, writer, method, path, auth, value=None):
+    """
+    Function that sends one request over an open connection and returns
+    the response status and JSON value.
+    """
+    body = b"" if value is None else json.dumps(value).encode("utf-8")
+    writer.write((f"{method} {path} HTTP/1.1\r\n"
+                  f"Host: localhost\r\n"
+                  f"Authorization: Basic {auth}\r\n"
+                  f"Content-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1")
+                 + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, header = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(header)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(args, auth, task_ids, counts, latencies, generator):
+    """
+    Function run by each client. It sends requests until the shared
+    request count runs out, recording the latency of each.
+    """
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        while counts["left"] > 0:
+            counts["left"] -= 1
+            if task_ids and generator.random() < args.writes:
+                method, path = "PATCH", f"/tasks/{generator.choice(task_ids)}"
+                value = {"due_date": f"{generator.randrange(1, 29):02d}/"
+                                     f"{generator.randrange(1, 13):02d}/2030"}
+            else:
+                method, path, value = "GET", "/tasks/mine", None
+            started = time.perf_counter()
+            status, _ = await request(reader, writer, method, path, auth,
+                                      value)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                counts["errors"] += 1
+    finally:
+        writer.close()
+
+
+async def run(args):
+    """
+    Function that runs the load test and prints the results.
+    """
+    auth = base64.b64encode(f"{args.user}:{args.password}".encode("utf-8"))
+    auth = auth.decode("ascii")
+    task_ids = []
+    if args.writes > 0:
+        # only incomplete tasks of the user can be modified
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+        _, tasks = await request(reader, writer, "GET", "/tasks/mine", auth)
+        writer.close()
+        task_ids = [task["id"] for task in tasks if not task["completed"]]
+        if not task_ids:
+            print(f"{args.user} has no incomplete tasks, so only reads will "
+                  f"be sent.")
+
+    counts = {"left": args.requests, "errors": 0}
+    latencies = []
+    generator = random.Random(0)
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        client(args, auth, task_ids, counts, latencies, generator)
+        for _ in range(args.clients)])
+    seconds = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"Clients: {args.clients}, requests: {len(latencies)} "
+          f"({args.writes:.0%} writes), errors: {counts['errors']}")
+    print(f"Throughput: {len(latencies) / seconds:.0f} requests/s")
+    print(f"Latency: p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms")
+    return 1 if counts["errors"] else 0
+
+
+def main():
+    """
+    Function that parses the command line and runs the load test.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.
+                                     RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--writes", type=float, default=0.0,
+                        help="share of requests that modify a task (0-1)")
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="adm1n")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
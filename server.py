@@ -0,0 +1,448 @@
+"""
+A local HTTP service giving the task manager operations as JSON
+endpoints, run from the command line, e.g.
+
+    python server.py --port 8000
+
+Every request logs in with HTTP basic authentication, using the same
+users as the menus. The endpoints are:
+
+    GET    /tasks            all tasks (filters: ?user=&completed=&overdue=
+                             &due_from=&due_to=&created_from=&created_to=
+                             &q=keywords)
+    GET    /tasks/mine       the logged in user's tasks
+    GET    /tasks/completed  completed tasks (admin only)
+    GET    /tasks/<id>       one task
+    POST   /tasks            add a task: {"user", "title", "description",
+                             "due_date"}
+    PATCH  /tasks/<id>       modify an incomplete task: {"completed": true}
+                             or {"user": ..., "due_date": ...}
+    DELETE /tasks/<id>       delete a task (admin only)
+    POST   /reports          generate the reports (admin only)
+"""
+# ===== Importing external modules ===========
+import argparse
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import task_manager
+
+# the largest request body accepted, in bytes
+MAX_BODY = 1024 * 1024
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request",
+           401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+# ==== HTTP Error Class ====
+class HTTPError(Exception):
+    """
+    An exception that ends a request with an error status and message.
+    """
+    def __init__(self, status, message):
+        """
+        Initialise an HTTP error.
+
+        Args:
+            status (int): The HTTP status code
+            message (str): The error message returned to the client
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ==== Task API Class ====
+class TaskAPI:
+    """
+    A class that handles the JSON requests against one task store. The
+    store is only ever used from a single worker thread, so all reads
+    and writes are serialized while the event loop keeps accepting and
+    parsing requests from other clients.
+    """
+    def __init__(self, store):
+        """
+        Initialise the API.
+
+        Args:
+            store (Storage): The storage backend shared by all clients
+        """
+        self.store = store
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        # SHA-256 of an accepted authorization header -> (username, stored
+        # password), so the slow password hash runs once per client login
+        self.logins = {}
+
+    async def run(self, function, *args):
+        """
+        Function that runs a blocking store operation on the store's
+        worker thread and returns its result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    async def handle(self, method, target, headers, body):
+        """
+        Function that handles one request and returns the response status
+        and JSON value.
+
+        Args:
+            method (str): The HTTP method
+            target (str): The request path and query string
+            headers (dict): The request headers, with lower case names
+            body (bytes): The request body
+        """
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        query = {name: values[-1]
+                 for name, values in parse_qs(url.query).items()}
+        user = await self.run(self.authenticate,
+                              headers.get("authorization", ""))
+
+        if parts == ["tasks"] and method == "GET":
+            filters = {"user": query.get("user"),
+                       "completed": query_flag(query, "completed"),
+                       "overdue": query_flag(query, "overdue"),
+                       "keywords": query.get("q")}
+            for name in ("due_from", "due_to", "created_from", "created_to"):
+                if name in query:
+                    filters[name] = query_date(query, name)
+            return 200, await self.run(self.list_tasks, filters)
+        if parts == ["tasks", "mine"] and method == "GET":
+            return 200, await self.run(self.list_tasks, {"user": user})
+        if parts == ["tasks", "completed"] and method == "GET":
+            require_admin(user)
+            return 200, await self.run(self.list_tasks, {"completed": True})
+        if parts == ["tasks"] and method == "POST":
+            return 201, await self.run(self.add_task, read_json(body))
+        if parts == ["reports"] and method == "POST":
+            require_admin(user)
+            return 200, await self.run(self.generate_reports)
+        if len(parts) == 2 and parts[0] == "tasks":
+            try:
+                task_id = int(parts[1])
+            except ValueError:
+                raise HTTPError(404, "Not found.")
+            if method == "GET":
+                return 200, await self.run(self.get_task, task_id)
+            if method == "PATCH":
+                return 200, await self.run(self.modify_task, user, task_id,
+                                           read_json(body))
+            if method == "DELETE":
+                require_admin(user)
+                return 200, await self.run(self.delete_task, task_id)
+            raise HTTPError(405, "Method not allowed.")
+        if parts in (["tasks"], ["tasks", "mine"], ["tasks", "completed"],
+                     ["reports"]):
+            raise HTTPError(405, "Method not allowed.")
+        raise HTTPError(404, "Not found.")
+
+    def authenticate(self, authorization):
+        """
+        Function that returns the user logged in by a basic
+        authentication header, raising HTTPError if the login fails.
+        """
+        users = self.store.get_users()
+        if users is None:
+            raise HTTPError(500, "Cannot read the users.")
+        key = hashlib.sha256(authorization.encode("utf-8")).digest()
+        login = self.logins.get(key)
+        # a cached login only counts while the password is unchanged
+        if login is not None and users.get(login[0]) == login[1]:
+            return login[0]
+
+        scheme, _, credentials = authorization.partition(" ")
+        if scheme.lower() != "basic":
+            raise HTTPError(401, "Login required.")
+        try:
+            decoded = base64.b64decode(credentials, validate=True)
+            name, _, password = decoded.decode("utf-8").partition(":")
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPError(401, "Login required.")
+        if not self.store.verify_user(name, password):
+            raise HTTPError(401, "Incorrect username or password.")
+        self.logins[key] = (name, self.store.get_users()[name])
+        return name
+
+    def list_tasks(self, filters):
+        """
+        Function that returns the stored tasks matching the filters.
+        """
+        return [task_json(task) for task in self.store.iter_tasks(**filters)]
+
+    def get_stored(self, task_id):
+        """
+        Function that returns a stored task, raising HTTPError if there is
+        none with that ID.
+        """
+        try:
+            return self.store.get(task_id)
+        except KeyError:
+            raise HTTPError(404, f"No task with ID {task_id}.")
+
+    def get_task(self, task_id):
+        """
+        Function that returns one stored task.
+        """
+        return task_json(self.get_stored(task_id))
+
+    def add_task(self, details):
+        """
+        Function that validates and stores a new task (see add_task).
+        """
+        if not isinstance(details, dict):
+            raise HTTPError(400, "Expected a JSON object.")
+        users = self.store.get_users()
+        if users is None:
+            raise HTTPError(500, "Cannot read the users.")
+        try:
+            task = task_manager.task_from_row(details, users)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        self.store.add(task)
+        return task_json(task)
+
+    def modify_task(self, user, task_id, changes):
+        """
+        Function that marks a task as complete, or changes its assigned
+        user and due date, in one write (see modify_task). Users may only
+        modify their own tasks, and completed tasks cannot be modified.
+        """
+        if not isinstance(changes, dict):
+            raise HTTPError(400, "Expected a JSON object.")
+        # e.g. a list as the user would not be a valid dictionary key
+        if not isinstance(changes.get("completed", False), bool):
+            raise HTTPError(400, "The completed field must be true or false.")
+        if not isinstance(changes.get("user", ""), str):
+            raise HTTPError(400, "The user field must be a username.")
+        task = self.get_stored(task_id)
+        if user != "admin" and task.user != user:
+            raise HTTPError(403, "You can only modify your own tasks.")
+        if task.is_complete():
+            raise HTTPError(409, "The task is complete and cannot be "
+                                 "modified.")
+        edits = []
+        if changes.get("completed") is True:
+            edits.append(("complete", task, None))
+        if "user" in changes:
+            users = self.store.get_users()
+            if users is None:
+                raise HTTPError(500, "Cannot read the users.")
+            if changes["user"] not in users:
+                raise HTTPError(400, "That user does not exist.")
+            edits.append(("reassign", task, changes["user"]))
+        if "due_date" in changes:
+            try:
+                due_day = task_manager.parse_date(str(changes["due_date"]))
+            except (ValueError, IndexError):
+                raise HTTPError(400, "Invalid date format. Please use "
+                                     "dd/mm/yyyy format.")
+            edits.append(("due", task, due_day))
+        if not edits:
+            raise HTTPError(400, "Nothing to change.")
+        try:
+            self.store.edit_many(edits)
+        except KeyError:
+            raise HTTPError(404, "This task was deleted by another user.")
+        return self.get_task(task_id)
+
+    def delete_task(self, task_id):
+        """
+        Function that deletes a stored task.
+        """
+        task = self.get_stored(task_id)
+        try:
+            self.store.delete(task)
+        except KeyError:
+            raise HTTPError(404, "That task was already deleted by another "
+                                 "user.")
+        return {"deleted": task_id}
+
+    def generate_reports(self):
+        """
+        Function that generates the reports as the menus do (see
+        task_manager.write_reports) and returns their lines.
+        """
+        reports = task_manager.write_reports()
+        if None in reports.values():
+            raise HTTPError(500, "Error generating reports.")
+        return {filename.split(".")[0]: text.split("\n")
+                for filename, text in reports.items()}
+
+    async def serve_client(self, reader, writer):
+        """
+        Function that serves the requests of one client connection, keeping
+        it open between requests unless the client asks to close it.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = \
+                        request_line.decode("latin-1").split()
+                except ValueError:
+                    await send(writer, 400, {"error": "Bad request."}, False)
+                    break
+                headers = await read_headers(reader)
+                keep_alive = keeps_alive(version, headers)
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY:
+                        raise HTTPError(413, "Request body is too large.")
+                    body = await reader.readexactly(length)
+                    status, value = await self.handle(method.upper(), target,
+                                                      headers, body)
+                except HTTPError as e:
+                    status, value = e.status, {"error": e.message}
+                except ValueError:
+                    status, value = 400, {"error": "Bad request."}
+                except Exception as e:
+                    status, value = 500, {"error": f"Server error: {e}"}
+                await send(writer, status, value, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+# ===== Helper Functions =====
+def task_json(task):
+    """
+    Function that returns the JSON details of a task object.
+    """
+    return {"id": task.get_id(),
+            "user": task.user,
+            "title": task.title,
+            "description": task.description,
+            "due_date": task_manager.date_str(task.due),
+            "date_assigned": task_manager.date_str(task.date_created),
+            "completed": task.is_complete(),
+            # complete tasks are never overdue, as in filter_tasks
+            "overdue": not task.is_complete() and task.is_overdue()}
+
+
+def query_flag(query, name):
+    """
+    Function that returns a yes/no query parameter as True, False or None
+    if it was not given.
+    """
+    if name not in query:
+        return None
+    return query[name].lower() in ("yes", "true", "1")
+
+
+def query_date(query, name):
+    """
+    Function that returns a date query parameter (dd/mm/yyyy or
+    yyyy-mm-dd) as a day ordinal.
+    """
+    try:
+        return task_manager.parse_date(query[name])
+    except (ValueError, IndexError):
+        raise HTTPError(400, f"Invalid {name}, use dd/mm/yyyy or "
+                             f"yyyy-mm-dd.")
+
+
+def require_admin(user):
+    """
+    Function that raises HTTPError unless the admin is logged in.
+    """
+    if user != "admin":
+        raise HTTPError(403, "Only the admin can do this.")
+
+
+def read_json(body):
+    """
+    Function that returns the JSON value of a request body.
+    """
+    try:
+        return json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "The request body is not valid JSON.")
+
+
+async def read_headers(reader):
+    """
+    Function that reads the request headers into a dictionary with lower
+    case names.
+    """
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+def keeps_alive(version, headers):
+    """
+    Function that returns whether the connection stays open after the
+    request, following the HTTP/1.0 and HTTP/1.1 defaults.
+    """
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+async def send(writer, status, value, keep_alive):
+    """
+    Function that writes a JSON response.
+    """
+    body = json.dumps(value).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+    if status == 401:
+        head += 'WWW-Authenticate: Basic realm="task manager"\r\n'
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+    await writer.drain()
+
+
+async def serve(host, port):
+    """
+    Function that runs the server until it is interrupted.
+    """
+    # load the tasks before the first request, so every request is
+    # answered from memory instead of reading the task file
+    task_manager.task_store.refresh()
+    api = TaskAPI(task_manager.task_store)
+    server = await asyncio.start_server(api.serve_client, host, port)
+    print(f"Serving the task manager on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """
+    Function that parses the command line and runs the server.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.
+                                     RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
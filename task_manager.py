@@ -3,101 +3,2281 @@ A  program  for  a  small  business  to  help  it
 manage  tasks  assigned  to  each  member  of  the  team
 """
 # ===== Importing external modules ===========
+import argparse
+import atexit
+import bisect
+import contextlib
+import cProfile
+import csv
 import datetime
+import functools
+import gzip
+import hashlib
+import heapq
+import hmac
+import itertools
+import json
+import mmap
+import os
+import re
+import sqlite3
+import stat
+import sys
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no fcntl, lock files with msvcrt instead
+    fcntl = None
+    import msvcrt
+
+
+# ===== Date Parsing =====
+MONTHS = {"jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+          "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12}
+# the most date strings parse_date() keeps the day ordinals of; task
+# files repeat a few thousand dates at most, while dates typed in the
+# menus or sent to the API should not grow the cache without limit
+DATE_CACHE_SIZE = 4096
+# day ordinal -> date string, filled in by day_str()
+day_str_cache = {}
+
+
+# ===== Task Pages =====
+# the number of tasks shown per page by view_all and view_mine
+PAGE_SIZE = int(os.environ.get("TASK_MANAGER_PAGE_SIZE", 10))
+
+
+# ===== Report Files =====
+REPORT_FILES = ("task_overview.txt", "user_overview.txt",
+                "trend_overview.txt")
+# the sources the report files were generated from (see generate_reports)
+REPORT_SOURCES_FILE = "report_sources.json"
+# one line of JSON with the report counters per day (see record_snapshot)
+REPORT_HISTORY_FILE = "report_history.jsonl"
+# the number of most recent daily snapshots in the trend overview
+TREND_DAYS = 14
+
+
+# ===== Task Archive =====
+# completed tasks due more than this many days ago are moved into the
+# archive whenever the journal is folded into the task file, or never if
+# it is not set (see TaskStore.archive)
+ARCHIVE_DAYS = (int(os.environ["TASK_MANAGER_ARCHIVE_DAYS"])
+                if os.environ.get("TASK_MANAGER_ARCHIVE_DAYS") else None)
+# the compressed bytes of the archive read at a time
+ARCHIVE_BLOCK_BYTES = 64 * 1024
+
+
+# ===== Reminders =====
+# tasks due within this many days are listed as due soon in reminders
+REMINDER_DAYS = 3
+# how often the reminder scheduler checks for tasks changed by other
+# sessions, in seconds
+REMINDER_POLL_SECONDS = 60
+
+
+# ===== Parallel Reports =====
+# the largest byte range of the task file counted by one worker job
+REPORT_CHUNK_BYTES = 32 * 1024 * 1024
+
+
+# ===== Password Hashing =====
+PASSWORD_SCHEME = "pbkdf2_sha256"
+# the PBKDF2 work factor for new and upgraded password hashes
+PASSWORD_ITERATIONS = int(os.environ.get("TASK_MANAGER_PASSWORD_ITERATIONS",
+                                         600_000))
+# checked instead for unknown usernames, so a failed login takes as long
+# whether or not the user exists; no password hashes to it
+DUMMY_PASSWORD_HASH = (f"{PASSWORD_SCHEME}${PASSWORD_ITERATIONS}$"
+                       f"{'0' * 32}${'0' * 64}")
+
+
+# ==== Profiler Class ====
+class Profiler:
+    """
+    A class that collects opt-in timings and counters for a session:
+    storage reads and writes, parsing, report builds and menu actions,
+    with the bytes read and written and the tasks parsed.
+
+    It is turned on with the TASK_MANAGER_PROFILE environment variable
+    or the --profile option. The value is a comma separated list of
+    outputs: "summary" (the default for any other value) prints a table
+    when the session ends, "trace" also writes profile_trace.json in the
+    Chrome trace event format and "cprofile" also writes profile.pstats.
+    While it is off, timed functions cost one attribute check per call.
+    """
+    def __init__(self, mode=None):
+        """
+        Initialise a profiler object.
+
+        Args:
+            mode (str): The outputs to produce, or None to stay off
+        """
+        self.enabled = False
+        self.outputs = set()
+        # name -> [calls, total seconds, longest call in seconds]
+        self.timers = {}
+        # name -> count
+        self.counters = {}
+        # (name, start, end) for every timed call, when tracing
+        self.events = []
+        self.started = time.perf_counter()
+        self.cprofile = None
+        if mode:
+            self.start(mode)
+
+    def start(self, mode="summary"):
+        """
+        Function that turns the profiler on and reports at exit.
+
+        Args:
+            mode (str): The comma separated outputs to produce
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        self.outputs = {output.strip().lower()
+                        for output in mode.split(",")} | {"summary"}
+        self.started = time.perf_counter()
+        if "cprofile" in self.outputs:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        atexit.register(self.finish)
+
+    def timed(self, name):
+        """
+        Decorator that records the time of every call to a function under
+        the given name.
+        """
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(name, started, time.perf_counter())
+            return wrapper
+        return decorate
+
+    def record(self, name, started, ended):
+        """
+        Function that adds one timed call.
+        """
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = [0, 0.0, 0.0]
+        seconds = ended - started
+        timer[0] += 1
+        timer[1] += seconds
+        timer[2] = max(timer[2], seconds)
+        if "trace" in self.outputs:
+            self.events.append((name, started, ended))
+
+    def add(self, name, amount=1):
+        """
+        Function that adds to a counter, if the profiler is on.
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        """
+        Function that returns the session's timings and counters as a
+        table.
+        """
+        seconds = time.perf_counter() - self.started
+        lines = [f"PROFILE ({seconds:.2f}s session):",
+                 f"{'Timer':<28}{'calls':>7}{'total s':>10}{'mean ms':>10}"
+                 f"{'max ms':>10}"]
+        for name, (calls, total, longest) in sorted(
+                self.timers.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<28}{calls:>7}{total:>10.3f}"
+                         f"{total / calls * 1000:>10.2f}"
+                         f"{longest * 1000:>10.2f}")
+        for name, count in sorted(self.counters.items()):
+            lines.append(f"{name:<28}{count:>17}")
+        return "\n".join(lines)
+
+    def finish(self):
+        """
+        Function that writes the session's profile outputs.
+        """
+        if not self.enabled:
+            return
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats("profile.pstats")
+        if "trace" in self.outputs:
+            # microseconds from the start of the session
+            trace = [{"name": name, "ph": "X", "pid": os.getpid(), "tid": 0,
+                      "ts": round((started - self.started) * 1e6),
+                      "dur": round((ended - started) * 1e6)}
+                     for name, started, ended in self.events]
+            with open("profile_trace.json", "w",
+                      encoding="utf-8") as trace_file:
+                json.dump({"traceEvents": trace,
+                           "counters": self.counters}, trace_file)
+        print(self.summary(), file=sys.stderr)
+        self.enabled = False
+
+
+# the session's profiler, off unless asked for
+profiler = Profiler(os.environ.get("TASK_MANAGER_PROFILE"))
 
 
 # ==== Task Class ====
 class Task:
     """
     A class representing a task.
+
+    Tasks are kept compact so large task files fit in memory: attributes
+    live in slots, user names are interned, dates are stored as day
+    ordinals and completion as a bool. The due date, creation date and
+    completion status are still available as datetime and "Yes"/"No"
+    properties.
+    """
+    __slots__ = ("user", "title", "description", "due_day", "created_day",
+                 "completed", "task_id")
+
+    def __init__(self, user, title, description, due_date, made, completion,
+                 task_id=None):
+        """
+        Initialise a task object.
+
+        Args:
+            user (str): The user the task is assigned to
+            title (str): The task title
+            description (str): The task description
+            due_date (datetime or int): The task due date, or its day
+                ordinal
+            made (datetime or int): The task creation date, or its day
+                ordinal
+            completion (str or bool): The task completion status
+            task_id (int): The unique task ID, None until it is stored
+        """
+        self.user = sys.intern(user)
+        self.title = title
+        self.description = description
+        self.due_day = day_ordinal(due_date)
+        self.created_day = day_ordinal(made)
+        if isinstance(completion, str):
+            self.completed = completion != "No"
+        else:
+            self.completed = bool(completion)
+        self.task_id = task_id
+
+    @property
+    def due(self):
+        """
+        The task due date as a datetime.
+        """
+        return datetime.datetime.fromordinal(self.due_day)
+
+    @due.setter
+    def due(self, due_date):
+        self.due_day = day_ordinal(due_date)
+
+    @property
+    def date_created(self):
+        """
+        The task creation date as a datetime.
+        """
+        return datetime.datetime.fromordinal(self.created_day)
+
+    @date_created.setter
+    def date_created(self, made):
+        self.created_day = day_ordinal(made)
+
+    @property
+    def completion(self):
+        """
+        The task completion status as "Yes" or "No".
+        """
+        return "Yes" if self.completed else "No"
+
+    def get_id(self):
+        """
+        Function that returns the unique task ID.
+        """
+        return self.task_id
+
+    def get_title(self):
+        """
+        Function that returns the task title.
+        """
+        return self.title
+
+    def get_assigned(self):
+        """
+        Function that returns the assigned user.
+        """
+        return self.user
+
+    def is_complete(self):
+        """
+        Function that returns True or False based on the completion
+        status.
+        """
+        return self.completed
+
+    def mark_as_complete(self):
+        """
+        Function that sets the task completion status as completed.
+        """
+        self.completed = True
+
+    def change_assigned(self, new_name):
+        """
+        Function that replaces the assigned user.
+
+        Args:
+            new_name (str): The assigned user replacement.
+        """
+        self.user = sys.intern(new_name)
+
+    def change_due_date(self, new_date):
+        """
+        Function that replaces the due date.
+
+        Args:
+            new_date (str): The due date replacement.
+        """
+        try:
+            self.due_day = parse_date(new_date)
+        except (ValueError, IndexError):
+            print("Invalid date format. Please use dd/mm/yyyy format.")
+
+    def is_overdue(self, now=None):
+        """
+        Function that returns True or False based on the overdue status
+        of the task
+
+        Args:
+            now (datetime): The time to compare against, defaults to the
+                current time
+        """
+        if now is None:
+            now = datetime.datetime.now()
+        return self.due_day < overdue_cutoff(now)
+
+    def __str__(self):
+        """
+        Function that returns a string representation of the object.
+        """
+        task_details = [self.user, self.title, self.description,
+                        date_str(self.due), date_str(self.date_created),
+                        self.completion]
+        if self.task_id is not None:
+            task_details.append(str(self.task_id))
+        return ", ".join(task_details)
+
+
+# ==== Task File Error Class ====
+class TaskFileError(Exception):
+    """
+    An error raised when a line of the task file cannot be read. The task
+    store then refuses to read or write tasks until the file is fixed, as
+    its next rewrite would otherwise drop the tasks it could not read.
+    """
+
+
+# ==== Storage Classes ====
+class Storage:
+    """
+    A class describing the interface shared by the storage backends for
+    tasks and users. The menu functions only use these methods, so any
+    backend can be swapped in.
+    """
+    def get_all(self):
+        """
+        Function that returns a list of all stored task objects.
+        """
+        raise NotImplementedError
+
+    def refresh(self):
+        """
+        Function that brings the store up to date, loading the tasks into
+        memory for backends that keep them there. Backends that answer
+        every query from storage have nothing to do.
+        """
+
+    def iter_tasks(self, **filters):
+        """
+        Function that returns an iterator over the stored tasks matching
+        the given filters (see filter_tasks).
+        """
+        raise NotImplementedError
+
+    def get(self, task_id):
+        """
+        Function that returns the stored task with the given ID, raising
+        KeyError if there is none.
+        """
+        raise NotImplementedError
+
+    def get_stats(self, workers=None):
+        """
+        Function that returns the report counters for the stored tasks.
+
+        Args:
+            workers (int): The number of processes that may be used to
+                count the tasks, where the backend supports it
+        """
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """
+        Function that returns a JSON value that changes whenever the
+        stored tasks or users change, used to tell if the reports are
+        out of date.
+        """
+        raise NotImplementedError
+
+    def archive(self, days, now=None):
+        """
+        Function that moves completed tasks due more than the given
+        number of days ago out of the stored tasks and into the archive,
+        returning how many were moved. Raises NotImplementedError if the
+        backend has no archive.
+        """
+        raise NotImplementedError
+
+    def iter_archived(self):
+        """
+        Function that returns an iterator over the archived tasks.
+        """
+        return iter(())
+
+    def count_archived(self):
+        """
+        Function that returns the number of archived tasks.
+        """
+        return 0
+
+    def locked(self):
+        """
+        Context manager that holds the store's write lock, so only one
+        session at a time writes files that belong with the store.
+        """
+        raise NotImplementedError
+
+    def get_reminders(self, soon_days=REMINDER_DAYS, now=None):
+        """
+        Function that returns the reminder queue of the incomplete tasks.
+        This builds a new queue from every incomplete task, which callers
+        polling for changes pass the queue it replaces (see
+        ReminderQueue.follow); backends that can keep one up to date as
+        tasks change return that instead.
+
+        Args:
+            soon_days (int): How many days ahead a task is due soon
+            now (datetime): The current time
+        """
+        return ReminderQueue(self.iter_tasks(completed=False), soon_days,
+                             now)
+
+    def add(self, task):
+        """
+        Function that stores a new task and gives it an ID.
+        """
+        self.add_many([task])
+
+    def complete(self, task):
+        """
+        Function that marks a stored task as complete.
+        """
+        self.edit_many([("complete", task, None)])
+
+    def reassign(self, task, new_name):
+        """
+        Function that assigns a stored task to another user.
+        """
+        self.edit_many([("reassign", task, new_name)])
+
+    def reschedule(self, task, new_date):
+        """
+        Function that changes the due date (dd/mm/yyyy) of a stored task.
+        """
+        try:
+            due_day = parse_date(new_date)
+        except (ValueError, IndexError):
+            print("Invalid date format. Please use dd/mm/yyyy format.")
+            return
+        self.edit_many([("due", task, due_day)])
+
+    def delete(self, task):
+        """
+        Function that deletes a stored task.
+        """
+        self.edit_many([("delete", task, None)])
+
+    def add_many(self, tasks):
+        """
+        Function that stores several new tasks in one write, giving each
+        an ID.
+        """
+        raise NotImplementedError
+
+    def edit_many(self, edits):
+        """
+        Function that applies several edits and saves them in one write.
+        Each edit is an (action, task, value) tuple, where the action is
+        "complete", "reassign" (value: the new user), "due" (value: the
+        new due date's day ordinal) or "delete". Raises KeyError if a task
+        is not stored, or ValueError if a due date is out of range, before
+        changing anything.
+        """
+        raise NotImplementedError
+
+    def check_task(self, task):
+        """
+        Function that returns a message explaining why a task cannot be
+        stored by this backend, or None if it can.
+        """
+        if any("\n" in field for field in (task.user, task.title,
+                                            task.description)):
+            return "fields cannot contain line breaks"
+        return None
+
+    def get_users(self):
+        """
+        Function that returns a dictionary of username -> password, or
+        None if the users cannot be read.
+        """
+        raise NotImplementedError
+
+    def add_user(self, name, password):
+        """
+        Function that stores a new user with a hash of their password.
+        """
+        raise NotImplementedError
+
+    def set_password(self, name, stored):
+        """
+        Function that replaces the stored password (hash) of a user.
+        """
+        raise NotImplementedError
+
+    @profiler.timed("auth: verify password")
+    def verify_user(self, name, password):
+        """
+        Function that returns True if the password is correct for the
+        user. Plain text passwords, and hashes with a lower work factor
+        than PASSWORD_ITERATIONS, are replaced with a new hash on the
+        user's first successful login.
+
+        Args:
+            name (str): The username
+            password (str): The password given at login
+        """
+        users = self.get_users()
+        if users is None or name not in users:
+            # hash the password anyway, so the time taken does not tell
+            # which usernames exist
+            check_password(DUMMY_PASSWORD_HASH, password)
+            return False
+        stored = users[name]
+        if not check_password(stored, password):
+            return False
+        if needs_rehash(stored):
+            self.set_password(name, hash_password(password))
+        return True
+
+
+class TaskStore(Storage):
+    """
+    The text file storage backend. It keeps the tasks from the task file
+    in memory, so the file is only parsed again when it has changed on
+    disk.
+
+    Every stored task carries a unique ID, and the store keeps an index
+    from each ID to the task's position so edits never need to scan. It
+    also keeps secondary indexes by user, by completion state and due
+    date, and (once the first keyword search needs it) from each word of
+    the titles and descriptions, so filtered listings and searches cost
+    time in proportion to their results.
+
+    In journaled mode, edits are appended as small records to a journal
+    file instead of rewriting the task file. The journal is replayed over
+    the task file on load and folded back into it once it grows past the
+    compaction threshold.
+
+    Several sessions can share the same files. Every read and write holds
+    a lock file, which also stores a generation number that goes up with
+    each write. Before writing, a session catches up with any newer
+    generation, so edits from other sessions are merged by task ID
+    instead of being overwritten.
     """
-    def __init__(self, user, title, description, due_date, made, completion):
+    def __init__(self, filename="tasks.txt", journal_file=None,
+                 compact_threshold=64 * 1024, user_file="user.txt",
+                 archive_days=None):
+        """
+        Initialise a task store object.
+
+        Args:
+            filename (str): The task file the store is loaded from
+            journal_file (str): The journal file for edits, or None to
+                rewrite the task file on every edit
+            compact_threshold (int): The journal size in bytes after which
+                it is folded back into the task file
+            user_file (str): The user file
+            archive_days (int): The age in days after which completed
+                tasks are archived when the journal is folded back, or
+                None to archive only when asked
+        """
+        self.filename = filename
+        self.journal_file = journal_file
+        self.compact_threshold = compact_threshold
+        self.user_file = user_file
+        self.archive_days = archive_days
+        base = os.path.splitext(filename)[0]
+        # compressed archived tasks and their precomputed totals
+        self.archive_file = base + "_archive.txt.gz"
+        self.archive_totals_file = base + "_archive.json"
+        self.users = UserRegistry(user_file)
+        self.lock_file = os.path.splitext(filename)[0] + ".lock"
+        # the open lock file while the lock is held
+        self.lock_handle = None
+        # (generation, epoch) from the lock file when last read
+        self.version = None
+        # bytes of the task and journal files already read
+        self.task_bytes = 0
+        self.journal_bytes = 0
+        # one slot per line of the task file, None once deleted
+        self.tasks = []
+        # task ID -> position in self.tasks
+        self.index = {}
+        # username -> set of task IDs
+        self.by_user = {}
+        # completion state -> sorted due keys (see due_key)
+        self.by_due = {True: [], False: []}
+        # word of the title or description -> set of task IDs, built on
+        # first use
+        self.by_token = None
+        self.next_id = 1
+        # report counters, built on first use
+        self.stats = None
+        # reminder queue of the incomplete tasks, built on first use
+        self.reminders = None
+        self.stats_signature = None
+        self.signature = None
+        self.loaded = False
+
+    def file_signature(self):
+        """
+        Function that returns the modification time and size of the task
+        file and journal file, with None for a file that cannot be found.
+        """
+        signature = []
+        for filename in (self.filename, self.journal_file):
+            try:
+                file_stats = os.stat(filename)
+                signature.append((file_stats.st_mtime_ns, file_stats.st_size))
+            except (OSError, TypeError):
+                signature.append(None)
+        return tuple(signature)
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Context manager that holds the lock file, so only one session at a
+        time reads or writes the task files. Nested uses share the lock.
+        """
+        if self.lock_handle is not None:
+            yield
+            return
+        descriptor = os.open(self.lock_file, os.O_RDWR | os.O_CREAT)
+        with open(descriptor, "r+", encoding="utf-8") as handle:
+            lock_file(handle)
+            self.lock_handle = handle
+            try:
+                yield
+            finally:
+                self.lock_handle = None
+                unlock_file(handle)
+
+    def read_version(self):
+        """
+        Function that returns the (generation, epoch, next ID) saved in
+        the lock file. The generation goes up with every write and the
+        epoch with every write that rewrites the task file. The next ID
+        never goes down, so the IDs of deleted tasks are not given out
+        again once they are compacted away.
+        """
+        self.lock_handle.seek(0)
+        try:
+            fields = [int(field) for field in self.lock_handle.read().split()]
+        except ValueError:
+            fields = []
+        if len(fields) == 2:
+            # lock files written before the next ID was saved
+            fields.append(0)
+        if len(fields) != 3:
+            return (0, 0, 0)
+        return tuple(fields)
+
+    def commit(self, rewritten=False):
+        """
+        Function that saves a new generation in the lock file after a
+        write, so other sessions know to catch up.
+
+        Args:
+            rewritten (bool): True if the task file was rewritten rather
+                than appended to
+        """
+        generation, epoch, _ = self.version
+        self.version = (generation + 1, epoch + 1 if rewritten else epoch,
+                        self.next_id)
+        # fixed width numbers overwrite the old ones without truncating
+        self.lock_handle.seek(0)
+        self.lock_handle.write(" ".join(f"{number:020d}"
+                                        for number in self.version))
+        self.lock_handle.flush()
+        self.mark_read()
+
+    def mark_read(self):
+        """
+        Function that remembers the current state of the task files as
+        already read.
+        """
+        self.signature = self.file_signature()
+        task_stats, journal_stats = self.signature
+        self.task_bytes = task_stats[1] if task_stats is not None else 0
+        self.journal_bytes = (journal_stats[1] if journal_stats is not None
+                              else 0)
+
+    def refresh(self):
+        """
+        Function that brings the store up to date with the task files,
+        loading them if they have not been loaded yet. If other sessions
+        have only appended tasks or journal records since the last read,
+        just the appended part is read.
+        """
+        with self.locked():
+            version = self.read_version()
+            if (self.loaded and version == self.version
+                    and self.file_signature() == self.signature):
+                return
+            upgraded = False
+            read_before = 0
+            if (self.loaded and version[1] == self.version[1]
+                    and version[0] > self.version[0]):
+                read_before = self.task_bytes + self.journal_bytes
+                self.read_appended()
+            else:
+                upgraded = self.load()
+            self.version = version
+            self.next_id = max(self.next_id, version[2])
+            self.mark_read()
+            profiler.add("bytes read",
+                         self.task_bytes + self.journal_bytes - read_before)
+            if upgraded:
+                # save the new IDs so they stay stable from now on
+                self.compact()
+
+    @profiler.timed("read: load files")
+    def load(self):
+        """
+        Function that loads all tasks from the task and journal files.
+        Returns True if any task from an older file was given a new ID.
+        Raises TaskFileError if a line of the task file cannot be read.
+        """
+        self.loaded = False
+        self.tasks = read_task_file(self.filename)
+        self.stats = None
+        upgraded = self.build_index()
+        # archived IDs are never given out again
+        self.next_id = max(
+            self.next_id,
+            read_archive_totals(self.archive_totals_file)["last_id"] + 1)
+        self.replay_journal()
+        self.build_secondary_indexes()
+        self.loaded = True
+        return upgraded
+
+    @profiler.timed("read: appended data")
+    def read_appended(self):
+        """
+        Function that applies the tasks and journal records that other
+        sessions appended after the store last read the files.
+        """
+        with open(self.filename, "rb") as task_file:
+            task_file.seek(self.task_bytes)
+            appended = task_file.read().decode("utf-8")
+        for line in appended.split("\n"):
+            if line:
+                profiler.add("tasks parsed")
+                try:
+                    task = parse_task(line)
+                except (ValueError, IndexError):
+                    # load again, which reports the line
+                    self.loaded = False
+                    raise TaskFileError(f"Cannot read a task appended to "
+                                        f"{self.filename}: {line!r}")
+                self.index[task.get_id()] = len(self.tasks)
+                self.tasks.append(task)
+                self.next_id = max(self.next_id, task.get_id() + 1)
+                self.track(task, 1)
+        if self.journal_file is None:
+            return
+        try:
+            with open(self.journal_file, "rb") as journal:
+                journal.seek(self.journal_bytes)
+                appended = journal.read().decode("utf-8")
+        except FileNotFoundError:
+            return
+        for task_id, records in parse_journal(appended.splitlines()).items():
+            position = self.index.get(task_id)
+            if position is None:
+                continue
+            task = self.tasks[position]
+            self.track(task, -1)
+            if replay_records(task, records):
+                self.track(task, 1)
+            else:
+                self.tasks[position] = None
+                del self.index[task_id]
+
+    def build_index(self):
+        """
+        Function that indexes the loaded tasks by ID, giving an ID to any
+        task from an older file that has none. Returns True if any task
+        was given a new ID.
+        """
+        self.index = {}
+        missing = []
+        for position, task in enumerate(self.tasks):
+            if task.get_id() is None:
+                missing.append(position)
+            else:
+                self.index[task.get_id()] = position
+        self.next_id = max(self.index, default=0) + 1
+        for position in missing:
+            # tasks without an ID take their line number, which is also
+            # how journal records written before IDs refer to them
+            task_id = position + 1
+            if task_id in self.index:
+                task_id = self.next_id
+            self.tasks[position].task_id = task_id
+            self.index[task_id] = position
+            self.next_id = max(self.next_id, task_id + 1)
+        return len(missing) > 0
+
+    def build_secondary_indexes(self):
+        """
+        Function that builds the user and due date indexes for the loaded
+        tasks. The word index is rebuilt when it is next needed.
+        """
+        self.by_user = {}
+        self.by_due = {True: [], False: []}
+        self.by_token = None
+        for task in self.tasks:
+            if task is not None:
+                self.by_user.setdefault(task.get_assigned(),
+                                        set()).add(task.get_id())
+                self.by_due[task.is_complete()].append(due_key(task))
+        for keys in self.by_due.values():
+            keys.sort()
+        if self.reminders is not None:
+            # rebuilt now rather than on next use, so the new queue can
+            # tell which users' reminders the reload changed
+            previous = self.reminders
+            self.reminders = ReminderQueue(
+                (task for task in self.tasks if task is not None),
+                previous.soon_days)
+            self.reminders.follow(previous)
+
+    @profiler.timed("search: build word index")
+    def build_token_index(self):
+        """
+        Function that builds the index from each word of the task titles
+        and descriptions to the tasks containing it.
+        """
+        self.by_token = {}
+        for task in self.tasks:
+            if task is not None:
+                for token in task_tokens(task):
+                    self.by_token.setdefault(token, set()).add(task.get_id())
+
+    def replay_journal(self):
+        """
+        Function that applies the journal records on top of the tasks
+        loaded from the task file.
+        """
+        for task_id, records in read_journal(self.journal_file).items():
+            position = self.index.get(task_id)
+            if position is None:
+                continue
+            if not replay_records(self.tasks[position], records):
+                self.tasks[position] = None
+                del self.index[task_id]
+
+    def get_all(self):
+        """
+        Function that returns a list of all task objects in the store.
+        """
+        self.refresh()
+        return [task for task in self.tasks if task is not None]
+
+    def iter_tasks(self, **filters):
+        """
+        Function that returns an iterator over the tasks matching the
+        given filters (see filter_tasks). Once the store is loaded the
+        tasks come from memory. Listing every task of an unloaded store
+        streams the task file without loading it, while the first
+        filtered query loads the store, so it and every later one can
+        use the indexes instead of reading the whole file again.
+        """
+        filtered = any(value is not None for name, value in filters.items()
+                       if name != "now")
+        if not self.loaded and not filtered:
+            return iter_tasks(self.filename, self.journal_file, **filters)
+        self.refresh()
+        task_ids = self.find_ids(**filters)
+        if task_ids is None:
+            tasks = (task for task in self.tasks if task is not None)
+        else:
+            # list the matches in task file order
+            positions = sorted(self.index[task_id] for task_id in task_ids)
+            tasks = (self.tasks[position] for position in positions)
+        return filter_tasks(tasks, **filters)
+
+    def find_ids(self, user=None, completed=None, overdue=None,
+                 due_from=None, due_to=None, now=None, created_from=None,
+                 created_to=None, keywords=None):
+        """
+        Function that uses the most selective secondary index to return
+        the IDs of the tasks that may match the filters, or None if no
+        index applies. The caller still has to apply every filter.
+        """
+        if keywords:
+            if self.by_token is None:
+                self.build_token_index()
+            # intersect the word sets, starting from the smallest
+            task_sets = sorted((self.by_token.get(token, set())
+                                for token in tokenize(keywords)), key=len)
+            if user is not None:
+                task_sets.append(self.by_user.get(user, set()))
+            if not task_sets:
+                return None
+            return task_sets[0].intersection(*task_sets[1:])
+        if user is not None:
+            return self.by_user.get(user, ())
+        if overdue:
+            if now is None:
+                now = datetime.datetime.now()
+            return due_ids(self.by_due[False], None,
+                           overdue_cutoff(now) - 1)
+        first_day = day_ordinal(due_from) if due_from is not None else None
+        last_day = day_ordinal(due_to) if due_to is not None else None
+        if completed is not None:
+            return due_ids(self.by_due[completed], first_day, last_day)
+        if first_day is not None or last_day is not None:
+            return (due_ids(self.by_due[True], first_day, last_day)
+                    + due_ids(self.by_due[False], first_day, last_day))
+        return None
+
+    @profiler.timed("report: count tasks")
+    def get_stats(self, workers=None):
+        """
+        Function that returns the report counters for the stored tasks,
+        building them in one pass if they are missing or out of date.
+
+        Args:
+            workers (int): The number of processes used to count the task
+                file when the store is not loaded (see parallel_stats)
+        """
+        if self.loaded:
+            self.refresh()
+        elif self.stats_signature != self.file_signature():
+            # counters streamed from the files are only valid while the
+            # files stay the same
+            self.stats = None
+        if self.stats is None or not self.stats.is_current():
+            self.stats_signature = self.file_signature()
+            self.stats = None
+            if not self.loaded and workers is not None and workers > 1:
+                # hold the lock so no session rewrites the files while
+                # the workers read them
+                with self.locked():
+                    self.stats_signature = self.file_signature()
+                    try:
+                        self.stats = parallel_stats(
+                            self.filename, self.journal_file, workers)
+                    except ValueError:
+                        # e.g. lines without IDs, which only a full load
+                        # can number
+                        self.stats = None
+            if self.stats is None and self.loaded:
+                self.stats = TaskStats(self.iter_tasks())
+            elif self.stats is None:
+                self.stats = file_stats(self.filename, self.journal_file)
+            # archived tasks are all complete, so they only add to the
+            # totals
+            totals = read_archive_totals(self.archive_totals_file)
+            for user, count in totals["users"].items():
+                self.stats.add_counts(user, count, count, 0,
+                                      totals["lead_days"].get(user, 0))
+        return self.stats
+
+    def get_reminders(self, soon_days=REMINDER_DAYS, now=None):
+        """
+        Function that returns the reminder queue of the incomplete tasks
+        (see Storage.get_reminders). The queue is built once and then
+        kept up to date as this and other sessions change tasks, until
+        the task file is rewritten.
+
+        Args:
+            soon_days (int): How many days ahead a task is due soon
+            now (datetime): The time the queue is built at
+        """
+        self.refresh()
+        if self.reminders is None or self.reminders.soon_days != soon_days:
+            self.reminders = ReminderQueue(self.iter_tasks(completed=False),
+                                           soon_days, now)
+        return self.reminders
+
+    def fingerprint(self):
+        """
+        Function that returns the size and modification time of the task,
+        journal and user files, with the write generation from the lock
+        file (see Storage.fingerprint).
+        """
+        with self.locked():
+            generation = self.read_version()
+            task_stats, journal_stats = self.file_signature()
+        return {"tasks": task_stats, "journal": journal_stats,
+                "users": file_fingerprint(self.user_file),
+                "generation": generation}
+
+    def track(self, task, step):
+        """
+        Function that adds (step 1) or removes (step -1) a task from the
+        secondary indexes and the report counters, if they have been
+        built.
+        """
+        if self.stats is not None:
+            self.stats.count(task, step)
+        if self.reminders is not None:
+            self.reminders.track(task, step)
+        task_ids = self.by_user.setdefault(task.get_assigned(), set())
+        due_keys = self.by_due[task.is_complete()]
+        if step > 0:
+            task_ids.add(task.get_id())
+            bisect.insort(due_keys, due_key(task))
+        else:
+            task_ids.discard(task.get_id())
+            del due_keys[bisect.bisect_left(due_keys, due_key(task))]
+        if self.by_token is None:
+            return
+        for token in task_tokens(task):
+            if step > 0:
+                self.by_token.setdefault(token, set()).add(task.get_id())
+            else:
+                token_ids = self.by_token.get(token)
+                if token_ids is not None:
+                    token_ids.discard(task.get_id())
+                    if not token_ids:
+                        del self.by_token[token]
+
+    def get(self, task_id):
+        """
+        Function that returns the stored task with the given ID, raising
+        KeyError if there is none.
+
+        Args:
+            task_id (int): The ID of the task
+        """
+        self.refresh()
+        return self.tasks[self.index[task_id]]
+
+    @profiler.timed("write: add tasks")
+    def add_many(self, tasks):
+        """
+        Function that gives new tasks IDs and appends them to the task
+        file in one write.
+
+        Args:
+            tasks (list): The tasks to add
+        """
+        if not tasks:
+            return
+        with self.locked():
+            self.refresh()
+            for task in tasks:
+                task.task_id = self.next_id
+                self.next_id += 1
+            lines = "\n".join(str(task) for task in tasks)
+            if profiler.enabled:
+                profiler.add("bytes written", len(lines.encode("utf-8")))
+            with open(self.filename, "a+b") as task_file:
+                # the task file has no line break after its last task
+                if task_file.seek(0, os.SEEK_END) > 0:
+                    task_file.seek(-1, os.SEEK_END)
+                    if task_file.read(1) != b"\n":
+                        lines = "\n" + lines
+                task_file.write(lines.encode("utf-8"))
+            for task in tasks:
+                self.index[task.get_id()] = len(self.tasks)
+                self.tasks.append(task)
+                self.track(task, 1)
+            self.commit()
+
+    @profiler.timed("write: edit tasks")
+    def edit_many(self, edits):
+        """
+        Function that applies several edits to stored tasks and records
+        them in one write (see Storage.edit_many). Edits saved by other
+        sessions are read first, so the edits apply to the latest version
+        of each task.
+
+        Args:
+            edits (list): The (action, task, value) edits to apply
+        """
+        with self.locked():
+            self.refresh()
+            stored_tasks = [self.tasks[self.index[task.get_id()]]
+                            for _, task, _ in edits]
+            # every record is built before any task changes, so a bad
+            # value (such as a due date out of range) changes nothing
+            edit_records = []
+            for action, task, value in edits:
+                details = [action, str(task.get_id())]
+                if action == "reassign":
+                    details.append(value)
+                elif action == "due":
+                    details.append(day_str(value))
+                edit_records.append(", ".join(details) + "\n")
+            records = []
+            for (action, _, value), stored, record in zip(
+                    edits, stored_tasks, edit_records):
+                if stored.get_id() not in self.index:
+                    # already deleted earlier in this batch
+                    continue
+                self.track(stored, -1)
+                if replay_records(stored, [(action, value)]):
+                    self.track(stored, 1)
+                else:
+                    self.tasks[self.index.pop(stored.get_id())] = None
+                records.append(record)
+            self.record(records)
+
+    def record(self, records):
+        """
+        Function that persists edits, either by appending their journal
+        records in one write or, without a journal, by rewriting the task
+        file. Must be called with the lock held.
+
+        Args:
+            records (list): The journal record lines for the edits
+        """
+        if self.journal_file is None:
+            self.compact()
+            return
+        journal_text = "".join(records)
+        if profiler.enabled:
+            profiler.add("bytes written", len(journal_text.encode("utf-8")))
+        with open(self.journal_file, "a", encoding="utf-8") as journal:
+            journal.write(journal_text)
+        self.commit()
+        if self.journal_bytes > self.compact_threshold:
+            # archiving rewrites the task file too, so it only needs a
+            # separate compaction if there was nothing to archive
+            if self.archive_days is None or not self.archive(
+                    self.archive_days):
+                self.compact()
+
+    @profiler.timed("write: compact")
+    def compact(self, batch=None):
+        """
+        Function that folds the journal back into the task file by
+        rewriting it with the current tasks.
+
+        Args:
+            batch (AtomicBatch): Other file writes to commit together
+                with the new task file
+        """
+        with self.locked():
+            tasks = [task for task in self.tasks if task is not None]
+            with batch or AtomicBatch() as writes:
+                writes.write(self.filename,
+                             "\n".join(str(task) for task in tasks))
+            # journal records only set values, so replaying them over the
+            # new task file after a crash here would change nothing
+            if (self.journal_file is not None
+                    and os.path.exists(self.journal_file)):
+                os.remove(self.journal_file)
+            self.tasks = tasks
+            self.index = {task.get_id(): position
+                          for position, task in enumerate(self.tasks)}
+            self.commit(rewritten=True)
+
+    @profiler.timed("write: archive")
+    def archive(self, days, now=None):
+        """
+        Function that moves completed tasks due more than the given
+        number of days ago into the archive file, then rewrites the task
+        file without them. Returns the number of tasks archived.
+
+        Each run appends one gzip member to the archive file, and the
+        per-user counts of archived tasks are kept in the archive totals
+        file so the reports never have to read the archive.
+
+        Args:
+            days (int): How many days ago a completed task must have been
+                due to be archived
+            now (datetime): The current time
+        """
+        if now is None:
+            now = datetime.datetime.now()
+        cutoff = day_ordinal(now) - days
+        with self.locked():
+            self.refresh()
+            archived = [task for task in self.tasks
+                        if task is not None and task.is_complete()
+                        and task.due_day < cutoff]
+            if not archived:
+                return 0
+            totals = read_archive_totals(self.archive_totals_file)
+            segment = gzip.compress("".join(
+                f"{task}\n" for task in archived).encode("utf-8"))
+            with open(self.archive_file, "ab") as archive_file:
+                # drop anything a run that crashed before saving its
+                # totals left behind
+                archive_file.truncate(totals["bytes"])
+                archive_file.write(segment)
+                archive_file.flush()
+                os.fsync(archive_file.fileno())
+            profiler.add("bytes written", len(segment))
+            totals["bytes"] += len(segment)
+            users = totals["users"]
+            lead_days = totals["lead_days"]
+            for task in archived:
+                task_lead_days = task.due_day - task.created_day
+                users[task.user] = users.get(task.user, 0) + 1
+                lead_days[task.user] = (lead_days.get(task.user, 0)
+                                        + task_lead_days)
+                totals["last_id"] = max(totals["last_id"], task.get_id())
+                self.track(task, -1)
+                if self.stats is not None:
+                    self.stats.add_counts(task.user, 1, 1, 0, task_lead_days)
+                self.tasks[self.index.pop(task.get_id())] = None
+            # the totals are replaced first, so a crash between the two
+            # renames leaves the tasks counted twice rather than lost
+            batch = AtomicBatch()
+            batch.write(self.archive_totals_file, json.dumps(totals))
+            self.compact(batch)
+        return len(archived)
+
+    def iter_archived(self):
+        """
+        Function that returns an iterator over the archived tasks (see
+        iter_archive).
+        """
+        return iter_archive(self.archive_file, self.archive_totals_file)
+
+    def count_archived(self):
+        """
+        Function that returns the number of archived tasks, from the
+        archive totals file.
+        """
+        totals = read_archive_totals(self.archive_totals_file)
+        return sum(totals["users"].values())
+
+    def check_task(self, task):
+        """
+        Function that returns a message explaining why a task cannot be
+        stored in the task file, or None if it can. Fields are separated
+        by ", " and tasks by line breaks, so neither can appear in a
+        field.
+        """
+        fields = (task.user, task.title, task.description)
+        if any(", " in field for field in fields):
+            return "fields cannot contain ', ' in the text task file"
+        return Storage.check_task(self, task)
+
+    def get_users(self):
+        """
+        Function that returns a dictionary of username -> stored password
+        from the user file, or None if it cannot be read. The file is
+        only read again when it has changed.
+        """
+        return self.users.get_users()
+
+    def add_user(self, name, password):
+        """
+        Function that appends a new user to the user file.
+
+        Args:
+            name (str): The username
+            password (str): The user's password, stored as a hash
+        """
+        with self.locked():
+            with open(self.user_file, "a", encoding="utf-8") as user_file:
+                user_details = f"{name}, {hash_password(password)}"
+                user_file.write("\n" + user_details)
+
+    def set_password(self, name, stored):
+        """
+        Function that replaces the stored password of a user by
+        rewriting the user file.
+
+        Args:
+            name (str): The username
+            stored (str): The new stored password hash
+        """
+        with self.locked():
+            users = self.users.get_users()
+            if users is None or name not in users:
+                return
+            users = dict(users)
+            users[name] = stored
+            atomic_write(self.user_file,
+                         "\n".join(f"{user}, {password}"
+                                   for user, password in users.items()))
+
+
+class SqliteStore(Storage):
+    """
+    A class that stores tasks and users in a SQLite database. Tasks are
+    indexed by user, completion and due date, so filtered listings and
+    report counters are answered by the database instead of by scanning
+    every task in Python.
+    """
+    def __init__(self, database="tasks.db"):
+        """
+        Initialise a SQLite store object, creating the tables if needed.
+
+        Args:
+            database (str): The database file
+        """
+        self.database = database
+        # wait for other sessions' transactions instead of failing
+        self.connection = sqlite3.connect(database, timeout=30)
+        self.connection.executescript(SQLITE_SCHEMA)
+
+    def get_all(self):
+        """
+        Function that returns a list of all stored task objects.
+        """
+        return list(self.iter_tasks())
+
+    def iter_tasks(self, user=None, completed=None, overdue=None,
+                   due_from=None, due_to=None, now=None, created_from=None,
+                   created_to=None, keywords=None):
+        """
+        Generator that yields the stored tasks matching the given filters
+        (see filter_tasks), filtered by the database. Keywords are
+        narrowed down with LIKE and then matched as whole words.
+        """
+        conditions = []
+        values = []
+        if user is not None:
+            conditions.append("user = ?")
+            values.append(user)
+        if completed is not None:
+            conditions.append("completed = ?")
+            values.append(int(completed))
+        if overdue is not None:
+            if now is None:
+                now = datetime.datetime.now()
+            condition = "(completed = 0 AND due_day < ?)"
+            conditions.append(condition if overdue else "NOT " + condition)
+            values.append(overdue_cutoff(now))
+        if due_from is not None:
+            conditions.append("due_day >= ?")
+            values.append(day_ordinal(due_from))
+        if due_to is not None:
+            conditions.append("due_day <= ?")
+            values.append(day_ordinal(due_to))
+        if created_from is not None:
+            conditions.append("created_day >= ?")
+            values.append(day_ordinal(created_from))
+        if created_to is not None:
+            conditions.append("created_day <= ?")
+            values.append(day_ordinal(created_to))
+        for token in tokenize(keywords or ""):
+            conditions.append("(title || ' ' || description) LIKE ? "
+                              "ESCAPE '\\'")
+            escaped = re.sub(r"([%_\\])", r"\\\1", token)
+            values.append(f"%{escaped}%")
+        query = ("SELECT user, title, description, due_day, created_day, "
+                 "completed, id FROM tasks")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        tasks = (Task(*row) for row in
+                 self.connection.execute(query + " ORDER BY id", values))
+        if keywords:
+            tasks = filter_tasks(tasks, keywords=keywords)
+        yield from tasks
+
+    def get(self, task_id):
+        """
+        Function that returns the stored task with the given ID, raising
+        KeyError if there is none.
+
+        Args:
+            task_id (int): The ID of the task
+        """
+        row = self.connection.execute(
+            "SELECT user, title, description, due_day, created_day, "
+            "completed, id FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        if row is None:
+            raise KeyError(task_id)
+        return Task(*row)
+
+    @profiler.timed("report: count tasks")
+    def get_stats(self, workers=None):
+        """
+        Function that returns the report counters for the stored tasks,
+        counted by the database (workers is ignored).
+        """
+        stats = TaskStats([])
+        rows = self.connection.execute(
+            "SELECT user, COUNT(*), SUM(completed), "
+            "SUM(completed = 0 AND due_day < ?), SUM(due_day - created_day) "
+            "FROM tasks GROUP BY user",
+            (overdue_cutoff(stats.now),))
+        for user, total, completed, overdue, lead_days in rows:
+            stats.add_counts(user, total, completed, overdue, lead_days)
+        return stats
+
+    def fingerprint(self):
+        """
+        Function that returns the size and modification time of the
+        database and its write-ahead log (see Storage.fingerprint).
+        """
+        return {"database": file_fingerprint(self.database),
+                "wal": file_fingerprint(self.database + "-wal")}
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Context manager that holds the database's write lock (see
+        Storage.locked) in a transaction that writes nothing.
+        """
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            yield
+
+    @profiler.timed("write: add tasks")
+    def add_many(self, tasks):
+        """
+        Function that inserts new tasks in one transaction and gives them
+        their database IDs.
+
+        Args:
+            tasks (list): The tasks to add
+        """
+        with self.connection:
+            for task in tasks:
+                cursor = self.connection.execute(
+                    "INSERT INTO tasks (user, title, description, due_day, "
+                    "created_day, completed) VALUES (?, ?, ?, ?, ?, ?)",
+                    (task.user, task.title, task.description, task.due_day,
+                     task.created_day, int(task.completed)))
+                task.task_id = cursor.lastrowid
+
+    @profiler.timed("write: edit tasks")
+    def edit_many(self, edits):
+        """
+        Function that applies several edits to stored tasks in one
+        transaction (see Storage.edit_many).
+
+        Args:
+            edits (list): The (action, task, value) edits to apply
+        """
+        statements = {
+            "complete": "UPDATE tasks SET completed = 1 WHERE id = ?",
+            "reassign": "UPDATE tasks SET user = ? WHERE id = ?",
+            "due": "UPDATE tasks SET due_day = ? WHERE id = ?",
+            "delete": "DELETE FROM tasks WHERE id = ?",
+        }
+        with self.connection:
+            for action, task, value in edits:
+                if action == "due":
+                    # raises ValueError for a date out of range
+                    datetime.date.fromordinal(value)
+                values = (task.get_id(),)
+                if value is not None:
+                    values = (value,) + values
+                cursor = self.connection.execute(statements[action], values)
+                if cursor.rowcount == 0:
+                    # leaving the with block rolls the whole batch back
+                    raise KeyError(task.get_id())
+        for action, task, value in edits:
+            replay_records(task, [(action, value)])
+
+    def get_users(self):
+        """
+        Function that returns a dictionary of username -> password, or
+        None if the database has no users yet.
+        """
+        users = dict(self.connection.execute(
+            "SELECT name, password FROM users ORDER BY rowid"))
+        if not users:
+            print("\nNo users found in the database. Run "
+                  "'python task_manager.py migrate' to import user.txt.")
+            return None
+        return users
+
+    def add_user(self, name, password):
+        """
+        Function that inserts a new user.
+
+        Args:
+            name (str): The username
+            password (str): The user's password, stored as a hash
+        """
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO users (name, password) VALUES (?, ?)",
+                (name, hash_password(password)))
+
+    def set_password(self, name, stored):
+        """
+        Function that replaces the stored password of a user.
+
+        Args:
+            name (str): The username
+            stored (str): The new stored password hash
+        """
+        with self.connection:
+            self.connection.execute(
+                "UPDATE users SET password = ? WHERE name = ?",
+                (stored, name))
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    name TEXT PRIMARY KEY,
+    password TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    due_day INTEGER NOT NULL,
+    created_day INTEGER NOT NULL,
+    completed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_by_user ON tasks (user, completed);
+CREATE INDEX IF NOT EXISTS tasks_by_completed ON tasks (completed, due_day);
+CREATE INDEX IF NOT EXISTS tasks_by_due ON tasks (due_day);
+"""
+
+
+# ==== User Registry Class ====
+class UserRegistry:
+    """
+    A class that keeps the users from the user file in memory, so
+    checking whether a user exists never reads the file. The file is
+    only parsed again when its modification time or size changes.
+    """
+    def __init__(self, filename="user.txt"):
+        """
+        Initialise a user registry object.
+
+        Args:
+            filename (str): The user file
+        """
+        self.filename = filename
+        # username -> stored password, None until the file is read
+        self.users = None
+        self.signature = None
+
+    def get_users(self):
+        """
+        Function that returns a dictionary of username -> stored
+        password, or None if the user file cannot be read.
+        """
+        try:
+            status = os.stat(self.filename)
+            signature = (status.st_mtime_ns, status.st_size)
+        except OSError:
+            signature = None
+        if self.users is None or signature != self.signature:
+            self.users = get_users(self.filename)
+            self.signature = signature
+        return self.users
+
+
+# ==== Task Statistics Class ====
+class TaskStats:
+    """
+    A class that holds the global and per-user task counters used by the
+    reports. The counters are built in one pass and then kept up to date
+    as tasks change, instead of being recounted for every report.
+    """
+    def __init__(self, tasks, now=None):
+        """
+        Initialise a task statistics object.
+
+        Args:
+            tasks (list): The task objects to count
+            now (datetime): The time overdue status is judged against,
+                defaults to the current time
+        """
+        self.now = now if now is not None else datetime.datetime.now()
+        self.total = 0
+        self.completed = 0
+        self.overdue = 0
+        # the days from assignment to due date, summed over the tasks
+        self.lead_days = 0
+        # username -> [total, completed, overdue, lead days]
+        self.users = {}
+        for task in tasks:
+            self.count(task, 1)
+
+    def count(self, task, step):
+        """
+        Function that adds (step 1) or removes (step -1) a task from the
+        counters.
+
+        Args:
+            task (Task): The task to count
+            step (int): 1 to add the task, -1 to remove it
+        """
+        user_counts = self.users.setdefault(task.get_assigned(),
+                                            [0, 0, 0, 0])
+        lead_days = step * (task.due_day - task.created_day)
+        self.total += step
+        self.lead_days += lead_days
+        user_counts[0] += step
+        user_counts[3] += lead_days
+        if task.is_complete():
+            self.completed += step
+            user_counts[1] += step
+        elif task.is_overdue(self.now):
+            self.overdue += step
+            user_counts[2] += step
+
+    def add_counts(self, user, total, completed, overdue, lead_days=0):
+        """
+        Function that adds counts that were already totalled elsewhere,
+        such as by a database query.
+        """
+        user_counts = self.users.setdefault(user, [0, 0, 0, 0])
+        for position, amount in enumerate((total, completed, overdue,
+                                           lead_days)):
+            user_counts[position] += amount
+        self.total += total
+        self.completed += completed
+        self.overdue += overdue
+        self.lead_days += lead_days
+
+    def get_user(self, user):
+        """
+        Function that returns the total, completed and overdue task counts
+        of a user.
+        """
+        return tuple(self.users.get(user, (0, 0, 0, 0))[:3])
+
+    def is_current(self):
+        """
+        Function that returns True if the counters are still valid. Due
+        dates are whole days, so overdue status can only change when the
+        day does.
+        """
+        return self.now.date() == datetime.date.today()
+
+
+# ==== Reminder Queue Class ====
+class ReminderQueue:
+    """
+    A class that keeps the incomplete tasks in a heap ordered by the day
+    each one next needs a reminder: first the day it becomes due soon,
+    then the day it becomes overdue. Only tasks at the top of the heap are
+    looked at when the day changes, and tasks that have reached a reminder
+    are kept in the due soon and overdue sets, so digests never scan every
+    task.
+
+    Changes to tasks are applied with track(). Heap entries of tasks that
+    have changed since are skipped when they reach the top.
+    """
+    def __init__(self, tasks, soon_days=REMINDER_DAYS, now=None):
+        """
+        Initialise a reminder queue object.
+
+        Args:
+            tasks (list): The task objects to queue; complete ones are
+                ignored
+            soon_days (int): How many days ahead a task is due soon
+            now (datetime): The time overdue status is judged against,
+                defaults to the current time
+        """
+        if now is None:
+            now = datetime.datetime.now()
+        self.soon_days = soon_days
+        # due dates before this day ordinal are overdue (see
+        # overdue_cutoff)
+        self.cutoff = overdue_cutoff(now)
+        # (reminder day ordinal, serial, task) entries
+        self.heap = []
+        # task ID -> serial of the task's current heap entry
+        self.serials = {}
+        self.serial = 0
+        # username -> {task ID: task} of the tasks that have reached a
+        # reminder
+        self.soon = {}
+        self.overdue = {}
+        # users whose digest has new tasks since it was last taken
+        self.changed = set()
+        for task in tasks:
+            self.track(task, 1)
+
+    def track(self, task, step):
+        """
+        Function that adds (step 1) or removes (step -1) a task from the
+        queue.
+
+        Args:
+            task (Task): The task that was added or changed
+            step (int): 1 to add the task, -1 to remove it
+        """
+        self.serials.pop(task.get_id(), None)
+        for reminders in (self.soon, self.overdue):
+            self.drop(reminders, task)
+        if step > 0 and not task.is_complete():
+            self.place(task)
+
+    def drop(self, reminders, task):
+        """
+        Function that removes a task from the due soon or overdue set.
+        """
+        user_tasks = reminders.get(task.get_assigned())
+        if user_tasks is not None:
+            user_tasks.pop(task.get_id(), None)
+            if not user_tasks:
+                del reminders[task.get_assigned()]
+
+    def place(self, task):
+        """
+        Function that puts a task in the set for its reminder today and
+        queues it for its next reminder.
+        """
+        user = task.get_assigned()
+        self.drop(self.soon, task)
+        if task.due_day < self.cutoff:
+            self.overdue.setdefault(user, {})[task.get_id()] = task
+            self.changed.add(user)
+            return
+        if task.due_day < self.cutoff + self.soon_days:
+            self.soon.setdefault(user, {})[task.get_id()] = task
+            self.changed.add(user)
+            day = task.due_day + 1
+        else:
+            day = task.due_day - self.soon_days + 1
+        self.serial += 1
+        self.serials[task.get_id()] = self.serial
+        heapq.heappush(self.heap, (day, self.serial, task))
+
+    def advance(self, now=None):
+        """
+        Function that moves the tasks whose reminder day has come into
+        the due soon or overdue set.
+
+        Args:
+            now (datetime): The current time
+        """
+        if now is None:
+            now = datetime.datetime.now()
+        self.cutoff = overdue_cutoff(now)
+        while self.heap and self.heap[0][0] <= self.cutoff:
+            _, serial, task = heapq.heappop(self.heap)
+            if self.serials.get(task.get_id()) == serial:
+                del self.serials[task.get_id()]
+                self.place(task)
+
+    def next_wake(self):
+        """
+        Function that returns the time the next reminder is due, or None
+        if no task is queued. A reminder day starts just after midnight
+        at the start of the day before it (see overdue_cutoff).
+        """
+        if not self.heap:
+            return None
+        return datetime.datetime.fromordinal(self.heap[0][0] - 1)
+
+    def follow(self, previous):
+        """
+        Function that takes over from the queue this one was rebuilt to
+        replace, so only users whose reminders differ are reported again.
+
+        Args:
+            previous (ReminderQueue): The queue being replaced
+        """
+        self.changed = previous.changed | {
+            user for user in self.changed
+            if any(reminders.get(user, {}).keys()
+                   != old.get(user, {}).keys()
+                   for reminders, old in ((self.soon, previous.soon),
+                                          (self.overdue, previous.overdue)))}
+
+    def take_digests(self):
+        """
+        Function that returns the digest of each user with new reminders
+        since the digests were last taken, as a dictionary of username ->
+        (overdue tasks, due soon tasks) sorted by due date.
+        """
+        digests = {}
+        for user in sorted(self.changed):
+            digests[user] = tuple(
+                sorted(reminders.get(user, {}).values(), key=due_key)
+                for reminders in (self.overdue, self.soon))
+        self.changed = set()
+        return digests
+
+
+# ==== Task Columns Class ====
+class TaskColumns:
+    """
+    A class that stores many tasks column by column in typed arrays, for
+    bulk work where even compact Task objects cost too much memory. Rows
+    are turned back into Task objects on demand.
+    """
+    def __init__(self, tasks=()):
+        """
+        Initialise a task columns object.
+
+        Args:
+            tasks (iterable): The task objects to store
+        """
+        # each distinct user name is stored once and referred to by code
+        self.user_names = []
+        self.user_codes = {}
+        self.users = array("I")
+        self.titles = []
+        self.descriptions = []
+        self.due_days = array("i")
+        self.created_days = array("i")
+        self.completed = bytearray()
+        # -1 stands for a task without an ID
+        self.task_ids = array("q")
+        for task in tasks:
+            self.append(task)
+
+    def append(self, task):
+        """
+        Function that adds a task as a new row.
+
+        Args:
+            task (Task): The task to add
+        """
+        code = self.user_codes.get(task.user)
+        if code is None:
+            code = len(self.user_names)
+            self.user_codes[task.user] = code
+            self.user_names.append(task.user)
+        self.users.append(code)
+        self.titles.append(task.title)
+        self.descriptions.append(task.description)
+        self.due_days.append(task.due_day)
+        self.created_days.append(task.created_day)
+        self.completed.append(task.completed)
+        self.task_ids.append(-1 if task.task_id is None else task.task_id)
+
+    def get_task(self, row):
+        """
+        Function that returns the task in a row as a Task object.
+
+        Args:
+            row (int): The row number
+        """
+        task_id = self.task_ids[row]
+        return Task(self.user_names[self.users[row]], self.titles[row],
+                    self.descriptions[row], self.due_days[row],
+                    self.created_days[row], bool(self.completed[row]),
+                    None if task_id == -1 else task_id)
+
+    def __len__(self):
+        """
+        Function that returns the number of rows.
+        """
+        return len(self.users)
+
+    def __iter__(self):
+        """
+        Function that yields every row as a Task object.
+        """
+        for row in range(len(self)):
+            yield self.get_task(row)
+
+
+# ==== Mapped Task File Class ====
+class TaskFile:
+    """
+    A class that reads the task file through a read-only memory map.
+    Records and their fields are found by searching the mapped bytes in
+    place, and only the fields a caller needs are decoded, so counts and
+    filtered listings over very large files create no strings or Task
+    objects for the lines they skip.
+
+    The map covers the file as it was when opened; tasks appended later
+    are not seen, and a file replaced by compaction stays readable.
+    """
+    def __init__(self, filename="tasks.txt"):
+        """
+        Initialise a mapped task file object.
+
+        Args:
+            filename (str): The task file
+        """
+        self.file = open(filename, "rb")
+        if os.fstat(self.file.fileno()).st_size > 0:
+            self.data = mmap.mmap(self.file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        else:
+            # an empty file cannot be mapped
+            self.data = b""
+        # date field -> day ordinal
+        self.days = {}
+        # due and assigned date fields -> (due day, lead days)
+        self.lead_days = {}
+
+    def close(self):
+        """
+        Function that unmaps and closes the task file.
+        """
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
         """
-        Initialise a task object.
+        Function that returns the mapped file for a with block.
+        """
+        return self
 
-        Args:
-            user (str): The user the task is assigned to
-            title (str): The task title
-            description (str): The task description
-            due_date (datetime): The task due date
-            made (datetime): The task creation date
-            completion (str): The task completion status
+    def __exit__(self, exc_type, exc_value, traceback):
         """
-        self.user = user
-        self.title = title
-        self.description = description
-        self.due = due_date
-        self.date_created = made
-        self.completion = completion
+        Function that closes the mapped file at the end of a with block.
+        """
+        self.close()
+        return False
 
-    def get_title(self):
+    def records(self):
         """
-        Function that returns the task title.
+        Generator that yields the (line number, start, end) byte offsets
+        of each record, without its line break.
         """
-        return self.title
+        data = self.data
+        size = len(data)
+        start = 0
+        line_number = 0
+        while start < size:
+            end = data.find(b"\n", start)
+            if end == -1:
+                end = size
+            line_number += 1
+            stop = end
+            if stop > start and data[stop - 1] == 13:
+                # "\r\n" line breaks
+                stop -= 1
+            yield line_number, start, stop
+            start = end + 1
 
-    def get_assigned(self):
+    def user_matches(self, start, end, user):
         """
-        Function that returns the assigned user.
+        Function that returns True if the record is assigned to a user,
+        given as encoded bytes followed by the field separator.
         """
-        return self.user
+        stop = min(start + len(user), end)
+        return self.data.find(user, start, stop) == start
 
-    def is_complete(self):
+    def completion(self, start, end):
         """
-        Function that returns True or False based on the completion
-        status.
+        Function that returns the (start, end) offsets of a record's
+        completion field and of its ID field, which is None for records
+        from older files without IDs.
         """
-        if self.completion == "No":
-            return False
-        else:
-            return True
+        data = self.data
+        last = data.rfind(b", ", start, end)
+        if data[last + 2:end] in (b"Yes", b"No"):
+            return (last + 2, end), None
+        previous = data.rfind(b", ", start, last)
+        return (previous + 2, last), (last + 2, end)
 
-    def mark_as_complete(self):
+    def is_complete(self, field):
         """
-        Function that sets the task completion status as completed.
+        Function that returns True if a completion field says "Yes".
         """
-        self.completion = "Yes"
+        return self.data[field[0]:field[1]] == b"Yes"
 
-    def change_assigned(self, new_name):
+    def due_day(self, start, end):
         """
-        Function that replaces the assigned user.
+        Function that returns the day ordinal of a record's due date, the
+        fourth field.
+        """
+        data = self.data
+        position = start
+        for _ in range(3):
+            position = data.find(b", ", position, end) + 2
+        due = data[position:data.find(b", ", position, end)]
+        due_day = self.days.get(due)
+        if due_day is None:
+            due_day = parse_date(due.decode("utf-8"))
+            self.days[due] = due_day
+        return due_day
+
+    def dates(self, start, end):
+        """
+        Function that returns the day ordinals of a record's due date and
+        assigned date, the fourth and fifth fields.
+        """
+        data = self.data
+        position = start
+        for _ in range(3):
+            position = data.find(b", ", position, end) + 2
+        days = []
+        for _ in range(2):
+            stop = data.find(b", ", position, end)
+            date = data[position:stop]
+            day = self.days.get(date)
+            if day is None:
+                day = parse_date(date.decode("utf-8"))
+                self.days[date] = day
+            days.append(day)
+            position = stop + 2
+        return days
+
+    def due_and_lead(self, start, end, field):
+        """
+        Function that returns the day ordinal of a record's due date and
+        the days from its assigned date to it. Dates written by date_str
+        are all the same width, so both sit at a fixed offset before the
+        completion field and are decoded once per distinct pair. A pair is
+        only cached once both separators are found where expected, so a
+        cached slice is always read correctly (see get_stats).
+        """
+        data = self.data
+        position = field[0] - 26
+        dates = data[position:field[0] - 2]
+        if dates[11:13] != b", " or data[position - 2:position] != b", ":
+            # dates of another width
+            due_day, created_day = self.dates(start, end)
+            return due_day, due_day - created_day
+        days = self.lead_days.get(dates)
+        if days is None:
+            ordinals = []
+            for date in (dates[:11], dates[13:]):
+                day = self.days.get(date)
+                if day is None:
+                    day = self.days[date] = parse_date(date.decode("utf-8"))
+                ordinals.append(day)
+            due_day, created_day = ordinals
+            days = self.lead_days[dates] = (due_day, due_day - created_day)
+        return days
+
+    def get_task(self, line_number, start, end):
+        """
+        Function that decodes a whole record into a Task object.
+        """
+        task = parse_task(self.data[start:end].decode("utf-8"))
+        if task.get_id() is None:
+            # tasks from older files are known by their line number
+            task.task_id = line_number
+        return task
+
+    def scan(self, journal=None, user=None, completed=None):
+        """
+        Generator that yields the records that may match a user and
+        completion state. Records with journal edits are yielded as Task
+        objects with the edits applied (deleted ones are skipped), and
+        all others as (line number, start, end, completion field)
+        tuples, so their fields can still be read without decoding.
 
         Args:
-            new_name (str): The assigned user replacement.
+            journal (dict): The journal records, as returned by
+                read_journal
+            user (str): Skip records of other users, unless they have
+                journal edits
+            completed (bool): Skip records with another completion state,
+                unless they have journal edits
         """
-        self.user = new_name
+        journal = journal or {}
+        user_prefix = None if user is None else (user + ", ").encode("utf-8")
+        for line_number, start, end in self.records():
+            field, id_field = self.completion(start, end)
+            if journal:
+                if id_field is None:
+                    task_id = line_number
+                else:
+                    task_id = int(self.data[id_field[0]:id_field[1]])
+                records = journal.get(task_id)
+                if records is not None:
+                    task = self.get_task(line_number, start, end)
+                    if replay_records(task, records):
+                        yield task
+                    continue
+            if user_prefix is not None and not self.user_matches(
+                    start, end, user_prefix):
+                continue
+            if completed is not None and self.is_complete(field) != completed:
+                continue
+            yield line_number, start, end, field
 
-    def change_due_date(self, new_date):
+    def iter_tasks(self, journal=None, user=None, completed=None):
         """
-        Function that replaces the due date.
+        Generator that yields Task objects for the records that may match
+        a user and completion state (see scan). Callers still apply their
+        full filters to the result.
+        """
+        for record in self.scan(journal, user, completed):
+            if isinstance(record, Task):
+                yield record
+            else:
+                yield self.get_task(*record[:3])
+
+    def count(self, journal=None, user=None, completed=None, overdue=None,
+              now=None):
+        """
+        Function that returns the number of tasks matching the filters
+        (see filter_tasks) without creating Task objects for records
+        that have no journal edits.
+        """
+        cutoff = overdue_cutoff(now if now is not None
+                                else datetime.datetime.now())
+        total = 0
+        for record in self.scan(journal, user, completed):
+            if isinstance(record, Task):
+                if next(filter_tasks([record], user, completed, overdue,
+                                     now=now), None) is not None:
+                    total += 1
+                continue
+            if overdue is not None:
+                _, start, end, field = record
+                is_overdue = (not self.is_complete(field)
+                              and self.due_day(start, end) < cutoff)
+                if is_overdue != overdue:
+                    continue
+            total += 1
+        return total
+
+    def get_stats(self, journal=None, now=None):
+        """
+        Function that returns the report counters for the task file,
+        reading only the user, completion and date fields of records
+        without journal edits.
+        """
+        stats = TaskStats([], now)
+        cutoff = overdue_cutoff(stats.now)
+        data = self.data
+        lead_days = self.lead_days
+        # encoded user -> [total, completed, overdue, lead days]
+        counts = {}
+        for record in self.scan(journal):
+            if isinstance(record, Task):
+                stats.count(record, 1)
+                continue
+            _, start, end, field = record
+            user = data[start:data.find(b", ", start, end)]
+            user_counts = counts.get(user)
+            if user_counts is None:
+                user_counts = counts[user] = [0, 0, 0, 0]
+            # most records repeat a known pair of dates
+            completion = field[0]
+            days = lead_days.get(data[completion - 26:completion - 2])
+            if days is None:
+                days = self.due_and_lead(start, end, field)
+            user_counts[0] += 1
+            user_counts[3] += days[1]
+            if data[completion:field[1]] == b"Yes":
+                user_counts[1] += 1
+            elif days[0] < cutoff:
+                user_counts[2] += 1
+        for user, user_counts in counts.items():
+            stats.add_counts(user.decode("utf-8"), *user_counts)
+        return stats
+
+
+# ==== Atomic Write Class ====
+class AtomicBatch:
+    """
+    A class that collects whole-file writes and commits them together.
+    Every file is first written and synced to a temporary file, and the
+    temporary files are only renamed over the originals once all of them
+    are complete. A crash or Ctrl-C part way through therefore leaves
+    each file either fully old or fully new, never truncated.
+
+    Use it as a context manager; the writes are committed when the block
+    ends without an error and discarded otherwise.
+    """
+    def __init__(self):
+        """
+        Initialise an atomic batch object.
+        """
+        # filename -> new contents
+        self.writes = {}
+
+    def write(self, filename, text):
+        """
+        Function that adds a file write to the batch.
 
         Args:
-            new_date (str): The due date replacement.
+            filename (str): The file to replace
+            text (str): The new file contents
+        """
+        self.writes[filename] = text
+
+    @profiler.timed("write: atomic files")
+    def commit(self):
         """
+        Function that writes every file in the batch.
+        """
+        temporary = []
         try:
-            new = new_date.split("/")
-            self.due = datetime.datetime(int(new[2]), int(new[1]), int(new[0]))
-        except (ValueError, IndexError):
-            print("Invalid date format. Please use dd/mm/yyyy format.")
+            for filename, text in self.writes.items():
+                temporary_name = f"{filename}.{os.getpid()}.tmp"
+                temporary.append((temporary_name, filename))
+                with open(temporary_name, "w", encoding="utf-8") as new_file:
+                    if profiler.enabled:
+                        profiler.add("bytes written",
+                                     len(text.encode("utf-8")))
+                    new_file.write(text)
+                    new_file.flush()
+                    os.fsync(new_file.fileno())
+                if os.path.exists(filename):
+                    # keep the permissions of the file being replaced
+                    os.chmod(temporary_name,
+                             stat.S_IMODE(os.stat(filename).st_mode))
+            for temporary_name, filename in temporary:
+                os.replace(temporary_name, filename)
+            for directory in {os.path.dirname(os.path.abspath(filename))
+                              for filename in self.writes}:
+                sync_directory(directory)
+        except BaseException:
+            for temporary_name, _ in temporary:
+                if os.path.exists(temporary_name):
+                    os.remove(temporary_name)
+            raise
+        finally:
+            self.writes = {}
 
-    def is_overdue(self):
+    def __enter__(self):
         """
-        Function that returns True or False based on the overdue status
-        of the task
+        Function that starts the batch.
         """
-        if self.due < datetime.datetime.now():
-            return True
-        else:
-            return False
+        return self
 
-    def __str__(self):
+    def __exit__(self, exc_type, exc_value, traceback):
         """
-        Function that returns a string representation of the object.
+        Function that commits the batch, or discards it after an error.
         """
-        task_details = [self.user, self.title, self.description,
-                        date_str(self.due), date_str(self.date_created),
-                        self.completion]
-        return ", ".join(task_details)
+        if exc_type is None:
+            self.commit()
+        else:
+            self.writes = {}
+        return False
 
 
 # ==== Login Section ====
@@ -106,7 +2286,7 @@ def login():
     Function to prompts user login and returns the logged in username.
     """
     # Open file to get user details
-    users = get_users()
+    users = task_store.get_users()
     if users is None:
         exit()
     else:
@@ -122,9 +2302,9 @@ def login():
                 valid_password = False
 
                 # Check validity
-                if name in users.keys():
+                if name in users:
                     valid_name = True
-                    if password == users.get(name):
+                    if task_store.verify_user(name, password):
                         valid_password = True
 
                 # Print error messages accordingly
@@ -144,12 +2324,13 @@ def login():
 
 
 # ===== Menu Functions =====
+@profiler.timed("menu: register user")
 def reg_user():
     """
     Function to register a new user.
     """
     # Open file to get user details
-    users = get_users()
+    users = task_store.get_users()
     if users is None:
         exit()
     else:
@@ -178,9 +2359,7 @@ def reg_user():
 
             # Append into user file when all is valid
             try:
-                with open("user.txt", "a", encoding="utf-8") as user_file:
-                    user_details = f"{name}, {password}"
-                    user_file.write("\n"+user_details)
+                task_store.add_user(name, password)
                 print("User registered successfully!\n")
             except FileNotFoundError:
                 print("\nCannot find file 'user.txt' in order to update.")
@@ -192,54 +2371,47 @@ def reg_user():
             print(f"An unexpected error occurred during registration: {e}")
 
 
+@profiler.timed("menu: view all")
 def view_all():
     """
     Function to display all tasks listed in tasks.txt.
     """
     try:
-        tasks = get_tasks()
-        for task in tasks:
-            display_task(task)
+        page_tasks(task_store.iter_tasks)
     except Exception as e:
         print(f"Error viewing all tasks: {e}")
 
 
+@profiler.timed("menu: view mine")
 def view_mine(username):
     """
     Function to display the current user's tasks.
     """
     try:
-        # get tasks
-        tasks = get_tasks()
-        my_tasks = []
-        task_count = 0
-        # Loop through each task and print if it's for the user
-        if len(tasks) > 0:
-            for task in tasks:
-                if username == task.get_assigned():
-                    print(f"Task {task_count}:")
-                    display_task(task)
-                    my_tasks.append(task)
-                    task_count += 1
-            # Print message if no tasks for the user, else allow edits
-            if task_count == 0:
-                print("\nYou do not have any tasks.\n")
-            else:
-                # run task selection to edit or complete tasks
-                select_task(my_tasks)
-        else:
+        # get the user's tasks
+        my_tasks = list(task_store.iter_tasks(user=username))
+        # print the user's tasks, numbered for selection
+        page_tasks(my_tasks, numbered=True)
+        # Print message if no tasks for the user, else allow edits
+        if len(my_tasks) > 0:
+            # run task selection to edit or complete tasks
+            select_task(my_tasks)
+        elif next(task_store.iter_tasks(), None) is None:
             print("There are no tasks available for any user.")
+        else:
+            print("\nYou do not have any tasks.\n")
     except Exception as e:
         print(f"Error viewing your tasks: {e}")
 
 
+@profiler.timed("menu: add task")
 def add_task():
     """
     Function to add a task to tasks.txt with user prompted details.
     """
     try:
         # Get task details from the user
-        users = get_users()
+        users = task_store.get_users()
         while True:
             username = input("Please give the username of the person whom the task"
                              " is assigned to: ")
@@ -250,17 +2422,19 @@ def add_task():
         title = input("Please give the title of the task: ")
         description = input("Please give the description of the task:\n")
         user_date = input("Please give the due date of the task (dd/mm/yyyy): ")
-        split_date = user_date.split("/")
-        date = datetime.datetime(int(split_date[2]), int(split_date[1]),
-                                 int(split_date[0]))
+        date = parse_date(user_date)
         # Create task object, with defaults
         created = datetime.datetime.now()
         completed = "No"
         task = Task(username, title, description, date, created, completed)
+        # e.g. a ", " in a field would split it into two in the task file
+        problem = task_store.check_task(task)
+        if problem is not None:
+            print(f"Cannot add the task: {problem}.")
+            return
         # Write to task file
         try:
-            with open('tasks.txt', "a", encoding="utf-8") as tasks:
-                tasks.write("\n"+str(task))
+            task_store.add(task)
             print("Task added successfuly!")
         except FileNotFoundError:
             print("\nUnable to locate 'tasks.txt' to add task. Please check the "
@@ -275,36 +2449,113 @@ def add_task():
         print(f"An unexpected error occurred while adding task: {e}")
 
 
+@profiler.timed("menu: view completed")
 def view_completed():
     """
-    Function to display all tasks marked as complete.
+    Function to display all tasks marked as complete, then optionally
+    the archived ones.
     """
     try:
-        # get tasks
-        tasks = get_tasks()
-        # count tasks completed
-        task_count = 0
-        # Loop through each task and print if it's completed
-        for task in tasks:
-            if task.is_complete():
-                display_task(task)
-                task_count += 1
+        any_completed = next(iter(task_store.iter_tasks(completed=True)),
+                             None) is not None
+        archived = task_store.count_archived()
         # Print 'error' message if no tasks compeleted
-        if task_count == 0:
+        if not any_completed and archived == 0:
             print("\nThere are currently no completed tasks.\n")
+            return
+        if any_completed:
+            page_tasks(lambda: task_store.iter_tasks(completed=True))
+        if archived > 0:
+            choice = input(f"{archived} older completed tasks are archived. "
+                           f"View them? (y/n): ").strip().lower()
+            if choice == "y":
+                page_tasks(task_store.iter_archived)
+    except KeyboardInterrupt:
+        print("\n\nViewing cancelled.")
     except Exception as e:
         print(f"Error viewing completed tasks: {e}")
 
 
+@profiler.timed("menu: search")
+def search():
+    """
+    Function to search tasks by any combination of user, completion,
+    due and assigned date ranges and keywords.
+    """
+    try:
+        print("\nSEARCH TASKS (leave a field blank to skip it):")
+        tasks = ask_search()
+        if tasks is None:
+            return
+        if len(tasks) == 0:
+            print("\nNo tasks match your search.\n")
+        else:
+            print(f"\n{len(tasks)} tasks found.")
+            page_tasks(tasks)
+    except (ValueError, IndexError):
+        print("Invalid date format. Please use dd/mm/yyyy format.")
+    except KeyboardInterrupt:
+        print("\n\nSearch cancelled.")
+    except Exception as e:
+        print(f"Error searching tasks: {e}")
+
+
+def ask_search():
+    """
+    Function that asks for the search filters and returns the list of
+    matching tasks, or None after an invalid answer. Raises ValueError
+    for an invalid date.
+    """
+    keywords = input("Keywords in the title or description: ").strip()
+    user = input("Assigned to: ").strip()
+    completed = input("Task complete? (y/n): ").strip().lower()
+    if completed not in ("", "y", "n"):
+        print("Invalid input. Please only enter y or n.")
+        return None
+    dates = []
+    for label in ("Due from", "Due until", "Assigned from",
+                  "Assigned until"):
+        text = input(f"{label} (dd/mm/yyyy): ").strip()
+        dates.append(parse_date(text) if text else None)
+    return search_tasks(user or None,
+                        {"": None, "y": True, "n": False}[completed],
+                        *dates, keywords or None)
+
+
+def search_tasks(user=None, completed=None, due_from=None, due_to=None,
+                 created_from=None, created_to=None, keywords=None):
+    """
+    Function that returns a list of the stored tasks matching every given
+    filter, in task order. Keyword searches use the task store's word
+    index where it has one.
+
+    Args:
+        user (str): Only tasks assigned to this user
+        completed (bool): Only complete (True) or incomplete (False) tasks
+        due_from (date): Only tasks due on or after this date
+        due_to (date): Only tasks due on or before this date
+        created_from (date): Only tasks assigned on or after this date
+        created_to (date): Only tasks assigned on or before this date
+        keywords (str): Only tasks with every word of this text in their
+            title or description
+
+    The dates may be date objects, day ordinals or date strings (see
+    parse_date).
+    """
+    dates = [parse_date(date) if isinstance(date, str) else date
+             for date in (due_from, due_to, created_from, created_to)]
+    return list(task_store.iter_tasks(
+        user=user, completed=completed, due_from=dates[0], due_to=dates[1],
+        created_from=dates[2], created_to=dates[3], keywords=keywords))
+
+
+@profiler.timed("menu: delete task")
 def delete_task():
     """
     Function to delete a user specified task.
     """
-    # ref: "https://www.geeksforgeeks.org/python/python-program-to-
-    # delete-specific-line-from-file/"
-
     try:
-        tasks = get_tasks()
+        tasks = task_store.get_all()
         if len(tasks) > 0:
             # print task titles with index and assignment
             print("\nAll tasks on record:")
@@ -321,21 +2572,17 @@ def delete_task():
             delete = input("Select the number of the task you wish to delete: ")
             try:
                 delete_int = int(delete)
-                # get delete index and rewrite task file without that line
+                # get delete index and delete that task
                 if delete_int in range(0, len(tasks)):
                     try:
-                        with open("tasks.txt", "w", encoding="utf-8") as task_file:
-                            for index, task in enumerate(tasks):
-                                if index != delete_int:
-                                    # remove newline tag and rewrite
-                                    plain_task = str(task).strip("\n")
-                                    if index == 0:
-                                        task_file.write(plain_task)
-                                    else:
-                                        task_file.write("\n" + plain_task)
+                        task_store.delete(tasks[delete_int])
                         # print message to indicate it is completed
                         print("Task deleted.")
                         break
+                    except KeyError:
+                        print("That task was already deleted by another "
+                              "user.")
+                        break
                     except IOError:
                         print("Error writing to tasks file.")
                 else:
@@ -349,29 +2596,217 @@ def delete_task():
         print(f"Error deleting task: {e}")
 
 
-def generate_reports():
+@profiler.timed("menu: bulk edit")
+def bulk_edit():
     """
-    Function to generate reports base on task and user information.
+    Function to complete, reassign, reschedule or delete many tasks at
+    once. The tasks are selected by number range, user or search filters
+    and all the changes are saved in one write.
     """
     try:
-        # get task overview
-        print("Generating task overview...")
-        task_overview()
+        tasks = select_bulk_tasks()
+        if not tasks:
+            return
+        print(f"\n{len(tasks)} tasks selected.")
+        action = input("Enter c (complete), r (reassign), s (shift due "
+                       "dates), d (delete), or q to cancel: "
+                       ).strip().lower()
+        if action == "c":
+            edits = [("complete", task, None) for task in tasks
+                     if not task.is_complete()]
+            message = f"{len(edits)} tasks marked as complete."
+        elif action == "r":
+            new_name = input("Assign the tasks to: ").strip()
+            users = task_store.get_users()
+            if users is None:
+                return
+            if new_name not in users:
+                print("That username does not exist. Please try again.")
+                return
+            edits = [("reassign", task, new_name) for task in tasks]
+            message = f"{len(edits)} tasks reassigned to {new_name}."
+        elif action == "s":
+            days = int(input("Shift the due dates by how many days "
+                             "(negative for earlier)? "))
+            last_day = datetime.date.max.toordinal()
+            if not all(1 <= task.due_day + days <= last_day
+                       for task in tasks):
+                print("That would move a due date out of range. Nothing "
+                      "was changed.")
+                return
+            edits = [("due", task, task.due_day + days) for task in tasks]
+            message = f"{len(edits)} due dates shifted by {days} days."
+        elif action == "d":
+            confirm = input(f"Delete {len(tasks)} tasks? (y/n): ")
+            if confirm.strip().lower() != "y":
+                print("Nothing was deleted.")
+                return
+            edits = [("delete", task, None) for task in tasks]
+            message = f"{len(edits)} tasks deleted."
+        else:
+            print("Nothing was changed.")
+            return
+        try:
+            task_store.edit_many(edits)
+            print(message)
+        except KeyError:
+            print("Some of those tasks were deleted by another user. "
+                  "Nothing was changed.")
+        except ValueError:
+            print("A due date is out of range. Nothing was changed.")
+        except IOError:
+            print("Error writing to tasks file.")
+    except ValueError:
+        print("Invalid input. Please enter a whole number.")
+    except KeyboardInterrupt:
+        print("\n\nBulk edit cancelled.")
+    except Exception as e:
+        print(f"Error editing tasks: {e}")
 
-        # get user overview
-        print("Generating user overview...")
-        user_overview()
 
+def select_bulk_tasks():
+    """
+    Function that asks how to select tasks for a bulk edit and returns
+    the list of selected tasks, or None if none were selected. Raises
+    ValueError for an invalid task number.
+    """
+    how = input("Select tasks by n (number range), u (user) or f (search "
+                "filters): ").strip().lower()
+    if how == "n":
+        tasks = task_store.get_all()
+        if len(tasks) == 0:
+            print("There are no tasks available.")
+            return None
+        page_tasks(tasks, numbered=True)
+        first = int(input("First task number: "))
+        last = int(input("Last task number: "))
+        if not 0 <= first <= last < len(tasks):
+            print("That selection is invalid. Please try again.")
+            return None
+        return tasks[first:last + 1]
+    if how == "u":
+        user = input("Assigned to: ").strip()
+        tasks = list(task_store.iter_tasks(user=user))
+    elif how == "f":
+        print("\nSEARCH TASKS (leave a field blank to skip it):")
+        try:
+            tasks = ask_search()
+        except (ValueError, IndexError):
+            print("Invalid date format. Please use dd/mm/yyyy format.")
+            return None
+        if tasks is None:
+            return None
+    else:
+        print("You have entered an invalid input. Please try again.")
+        return None
+    if len(tasks) == 0:
+        print("\nNo tasks match your selection.\n")
+        return None
+    return tasks
+
+
+@profiler.timed("menu: archive tasks")
+def archive_tasks():
+    """
+    Function to move completed tasks due more than a user specified
+    number of days ago into the archive.
+    """
+    try:
+        days = int(input("Archive completed tasks due more than how many "
+                         "days ago? "))
+        if days < 0:
+            raise ValueError
+        count = task_store.archive(days)
+        print(f"{count} tasks archived.")
+    except ValueError:
+        print("Invalid input. Please enter a whole number of days.")
+    except NotImplementedError:
+        print("Archiving is only available with the text task files.")
+    except IOError:
+        print("Error writing to the archive file.")
+    except KeyboardInterrupt:
+        print("\n\nArchiving cancelled.")
+    except Exception as e:
+        print(f"Error archiving tasks: {e}")
+
+
+@profiler.timed("menu: generate reports")
+def generate_reports(workers=None):
+    """
+    Function to generate reports base on task and user information.
+
+    Args:
+        workers (int): The number of processes used to count the tasks
+            if they are not loaded yet, defaults to one
+    """
+    try:
+        write_reports(workers, verbose=True)
         print("Reports generated.")
     except Exception as e:
         print(f"Error generating reports: {e}")
 
 
+def write_reports(workers=None, verbose=False):
+    """
+    Function that counts the tasks once and writes every report file,
+    with the sources they were generated from, together. The trends
+    include today's counters, which are added to the report history once
+    the reports are written. Returns a dictionary of report file name ->
+    text, with None for a report that could not be generated.
+
+    Args:
+        workers (int): The number of processes used to count the tasks
+            if they are not loaded yet, defaults to one
+        verbose (bool): Whether to print each report as it is generated
+    """
+    # taken first, so a write during the counting makes the reports
+    # count as out of date
+    sources = {"computed": datetime.datetime.now().isoformat(),
+               "sources": task_store.fingerprint()}
+    # raises TaskFileError for a task file that cannot be read, so
+    # nothing is written from partial counters
+    stats = task_store.get_stats(workers)
+    snapshot = history_snapshot(stats)
+    snapshots = read_history()
+    if snapshots and snapshots[-1].get("date") == snapshot["date"]:
+        snapshots.pop()
+    snapshots.append(snapshot)
+    reports = {}
+    # the report files are replaced together when the batch ends
+    with AtomicBatch() as batch:
+        # get task overview
+        if verbose:
+            print("Generating task overview...")
+        reports["task_overview.txt"] = task_overview(batch, stats)
+
+        # get user overview
+        if verbose:
+            print("Generating user overview...")
+        reports["user_overview.txt"] = user_overview(batch, stats)
+
+        # add today's counters to the history and get the trends
+        if verbose:
+            print("Generating trend overview...")
+        reports["trend_overview.txt"] = trend_overview(batch, snapshots)
+
+        batch.write(REPORT_SOURCES_FILE, json.dumps(sources))
+    # hold the store lock so two sessions do not both add today's line
+    with task_store.locked():
+        record_snapshot(stats)
+    return reports
+
+
+@profiler.timed("menu: display statistics")
 def display_statistics():
     """
-    Function to display generated reports on task and user information.
+    Function to display generated reports on task and user information,
+    generating them first if they are missing or out of date.
     """
     try:
+        if not reports_current():
+            print("The reports are out of date.")
+            generate_reports()
+
         # print task overview
         print("TASK OVERVIEW:")
         display_task_overview()
@@ -379,6 +2814,10 @@ def display_statistics():
         # print user overview
         print("USERS OVERVIEW:")
         display_user_overview()
+
+        # print trend overview
+        print("TRENDS:")
+        display_trend_overview()
     except Exception as e:
         print(f"Error displaying statistics: {e}")
 
@@ -391,6 +2830,227 @@ def date_str(date):
     return date.strftime("%d %b %Y")
 
 
+def tokenize(text):
+    """
+    Function that returns the set of lower case words in a text, as used
+    by the keyword search.
+    """
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def task_tokens(task):
+    """
+    Function that returns the set of words in a task's title and
+    description.
+    """
+    return tokenize(task.title + " " + task.description)
+
+
+def day_str(day):
+    """
+    Function that returns a day ordinal as a date string, as date_str()
+    would. Task lists repeat a small set of dates, so the strings are
+    cached.
+    """
+    text = day_str_cache.get(day)
+    if text is None:
+        text = date_str(datetime.date.fromordinal(day))
+        day_str_cache[day] = text
+    return text
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(text):
+    """
+    Function that returns the day ordinal of a date string, either in the
+    task file format ("DD Mon YYYY"), as typed by users (dd/mm/yyyy) or
+    in ISO format (yyyy-mm-dd). Task files repeat a small set of dates,
+    so the most recently parsed ones are cached (see DATE_CACHE_SIZE).
+
+    Raises ValueError if the string is not a valid date.
+    """
+    if "/" in text:
+        day, month, year = text.split("/")
+        month = int(month)
+    elif "-" in text:
+        year, month, day = text.split("-")
+        month = int(month)
+    else:
+        day, month, year = text.split(" ")
+        if month.lower() not in MONTHS:
+            raise ValueError(f"unknown month '{month}'")
+        month = MONTHS[month.lower()]
+    return datetime.date(int(year), month, int(day)).toordinal()
+
+
+def overdue_cutoff(now):
+    """
+    Function that returns the day ordinal from which due dates are no
+    longer overdue at the given time. A due date is midnight at the start
+    of its day, so a task due today is overdue once midnight has passed.
+    """
+    if now.time() == datetime.time():
+        return now.toordinal()
+    return now.toordinal() + 1
+
+
+def hash_password(password, iterations=None):
+    """
+    Function that returns a salted PBKDF2 hash of a password, in the form
+    "pbkdf2_sha256$iterations$salt$hash".
+
+    Args:
+        password (str): The password
+        iterations (int): The work factor, defaults to PASSWORD_ITERATIONS
+    """
+    if iterations is None:
+        iterations = PASSWORD_ITERATIONS
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt,
+                                 iterations)
+    return f"{PASSWORD_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def check_password(stored, password):
+    """
+    Function that returns True if a password matches a stored password,
+    which is either a hash from hash_password() or, for users not yet
+    upgraded, the plain text. Compares in constant time.
+    """
+    parts = stored.split("$")
+    if len(parts) == 4 and parts[0] == PASSWORD_SCHEME:
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"),
+                                     bytes.fromhex(parts[2]), int(parts[1]))
+        return hmac.compare_digest(digest.hex(), parts[3])
+    return hmac.compare_digest(stored.encode("utf-8"),
+                               password.encode("utf-8"))
+
+
+def needs_rehash(stored):
+    """
+    Function that returns True if a stored password is plain text or was
+    hashed with a lower work factor than PASSWORD_ITERATIONS.
+    """
+    parts = stored.split("$")
+    if len(parts) != 4 or parts[0] != PASSWORD_SCHEME:
+        return True
+    return int(parts[1]) < PASSWORD_ITERATIONS
+
+
+def atomic_write(filename, text):
+    """
+    Function that replaces the contents of a file atomically (see
+    AtomicBatch).
+    """
+    with AtomicBatch() as batch:
+        batch.write(filename, text)
+
+
+def sync_directory(directory):
+    """
+    Function that flushes a directory to disk so renames in it survive a
+    crash. Not every system supports this, so failures are ignored.
+    """
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def lock_file(handle):
+    """
+    Function that waits for and takes an exclusive lock on an open file.
+    """
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def unlock_file(handle):
+    """
+    Function that releases a lock taken by lock_file.
+    """
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def due_key(task):
+    """
+    Function that returns a single integer that sorts tasks by due date
+    and then ID, used for the due date indexes.
+    """
+    return (task.due_day << 32) | task.get_id()
+
+
+def due_ids(due_keys, first_day=None, last_day=None):
+    """
+    Function that returns the task IDs in a sorted list of due keys whose
+    due dates fall in the given (inclusive) range of day ordinals.
+    """
+    start = 0
+    end = len(due_keys)
+    if first_day is not None:
+        start = bisect.bisect_left(due_keys, first_day << 32)
+    if last_day is not None:
+        end = bisect.bisect_left(due_keys, (last_day + 1) << 32)
+    return [key & 0xFFFFFFFF for key in due_keys[start:end]]
+
+
+def day_ordinal(date):
+    """
+    Function that returns the day ordinal of a date, accepting either a
+    date/datetime object or an ordinal that was already converted.
+    """
+    if isinstance(date, int):
+        return date
+    return date.toordinal()
+
+
+def file_fingerprint(filename):
+    """
+    Function that returns the modification time and size of a file, or
+    None if it cannot be found.
+    """
+    try:
+        file_stats = os.stat(filename)
+        return [file_stats.st_mtime_ns, file_stats.st_size]
+    except OSError:
+        return None
+
+
+def reports_current():
+    """
+    Function that returns True if the report files exist and were
+    generated today from the tasks and users as they are now. Overdue
+    status only changes when the day does, so reports from earlier in
+    the day are still correct.
+    """
+    try:
+        with open(REPORT_SOURCES_FILE, "r", encoding="utf-8") as sources:
+            saved = json.load(sources)
+        computed = datetime.datetime.fromisoformat(saved["computed"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+    if not all(os.path.exists(filename) for filename in REPORT_FILES):
+        return False
+    if computed.date() != datetime.date.today():
+        return False
+    # compare as JSON, which turns tuples into lists
+    current = json.loads(json.dumps(task_store.fingerprint()))
+    return saved["sources"] == current
+
+
 def display_task_overview():
     """
     Function that gets task overview details and prints them.
@@ -420,6 +3080,32 @@ def display_task_overview():
         print(f"Error displaying task overview: {e}")
 
 
+def display_trend_overview():
+    """
+    Function that gets trend overview details and prints them.
+    """
+    try:
+        with open("trend_overview.txt", "r", encoding="utf-8") as overview:
+            rows = [line.strip("\n").split(", ") for line in overview
+                    if line.strip()]
+        if not rows:
+            print("There is no report history yet.")
+            return
+        print("\u2500"*70)
+        print(f"{'Date':<12}{'Tasks':>8}{'Completed':>11}{'Done/day':>10}"
+              f"{'Overdue %':>11}{'Avg days to due':>18}")
+        for date, total, completed, velocity, overdue, lead in rows:
+            print(f"{date:<12}{total:>8}{completed:>11}{velocity or '-':>10}"
+                  f"{overdue:>11}{lead:>18}")
+        print("\u2500"*70)
+    except FileNotFoundError:
+        print("Cannot display trends. No reports were generated.")
+    except IOError:
+        print("Error reading trend overview file.")
+    except Exception as e:
+        print(f"Error displaying trend overview: {e}")
+
+
 def display_user_overview():
     """
     Function that gets user overview details and prints them.
@@ -458,14 +3144,14 @@ def display_user_overview():
         print(f"Error displaying user overview: {e}")
 
 
-def get_users():
+def get_users(filename="user.txt"):
     """
     Function that returns a dictionary of users, with the key as the
     username and the value as the password.
     """
     try:
         # Get user details from file
-        with open("user.txt", "r", encoding="utf-8") as users:
+        with open(filename, "r", encoding="utf-8") as users:
             user_details = users.readlines()
 
         # Split details, add to dictionary and return
@@ -486,29 +3172,172 @@ def get_users():
         return None
 
 
-def display_task(task_object):
+def format_task(task):
+    """
+    Function that returns the display text of a task object, formatted
+    straight from its fields.
+    """
+    # ref: "https://stackoverflow.com/questions/65561243/
+    # print-a-horizontal-line-in-python"
+    rule = "\u2500"*50
+    # ref: "https://labex.io/tutorials/python-how-to-customize-
+    # column-display-in-python-421861"
+    return (f"{rule}\n"
+            f"{'Task:':<20}{task.title}\n"
+            f"{'Assigned to:':<20}{task.user}\n"
+            f"{'Date assigned:':<20}{day_str(task.created_day)}\n"
+            f"{'Due date:':<20}{day_str(task.due_day)}\n"
+            f"{'Task complete?':<20}{task.completion}\n"
+            f"Task Description:\n  {task.description}\n"
+            f"{rule}\n")
+
+
+def format_digest(user, overdue, soon, now):
+    """
+    Function that returns the reminder digest of a user as one string.
+
+    Args:
+        user (str): The username
+        overdue (list): The user's overdue task objects
+        soon (list): The user's task objects due soon
+        now (datetime): The time of the digest
+    """
+    parts = [f"Reminders for {user} on {date_str(now)}:\n"]
+    for label, tasks in (("Overdue", overdue), ("Due soon", soon)):
+        if tasks:
+            parts.append(f"  {label} ({len(tasks)}):\n")
+            parts.extend(f"    #{task.get_id()} {task.title} - due "
+                         f"{day_str(task.due_day)}\n" for task in tasks)
+    return "".join(parts) + "\n"
+
+
+def format_page(tasks, first, numbered=False):
+    """
+    Function that returns the display text of a page of tasks as one
+    string.
+
+    Args:
+        tasks (list): The task objects on the page
+        first (int): The number of the first task on the page
+        numbered (bool): Whether to show each task's number
+    """
+    parts = []
+    for number, task in enumerate(tasks, first):
+        if numbered:
+            parts.append(f"Task {number}:\n")
+        parts.append(format_task(task))
+    return "".join(parts)
+
+
+def page_tasks(tasks, numbered=False, page_size=None):
     """
-    Function that displays the details of a task object.
+    Function that displays tasks one page at a time, writing each page
+    in one go. The user can move to the next or previous page or jump to
+    a page number. Given a function that returns an iterator over the
+    tasks instead of a list, the tasks are read one page at a time as
+    the user moves on, so only the page being shown is held in memory.
+    Tasks that fit on one page are shown without asking.
+
+    Args:
+        tasks (list or function): The task objects to display, or a
+            function returning a new iterator over them each call
+        numbered (bool): Whether to show each task's number
+        page_size (int): The tasks per page, defaults to PAGE_SIZE
     """
-    try:
-        # get details from object
-        task_details = str(task_object).split(", ")
-        # ref: "https://stackoverflow.com/questions/65561243/
-        # print-a-horizontal-line-in-python"
-        print("\u2500"*50)
-        label = ["Task:", "Assigned to:", "Date assigned:", "Due date:",
-                 "Task complete?", "Task Description:"]
-        # ref: "https://labex.io/tutorials/python-how-to-customize-
-        # column-display-in-python-421861"
-        print(f"{label[0]:<20}{task_details[1]}")
-        print(f"{label[1]:<20}{task_details[0]}")
-        print(f"{label[2]:<20}{task_details[4]}")
-        print(f"{label[3]:<20}{task_details[3]}")
-        print(f"{label[4]:<20}{task_details[5]}")
-        print(f"{label[5]}\n  {task_details[2]}")
-        print("\u2500"*50)
-    except Exception as e:
-        print(f"Error displaying task: {e}")
+    if page_size is None:
+        page_size = PAGE_SIZE
+    page_size = max(1, page_size)
+    if callable(tasks):
+        stream_pages(tasks, numbered, page_size)
+        return
+    tasks = list(tasks)
+    pages = max(1, (len(tasks) + page_size - 1) // page_size)
+    page = 0
+    while True:
+        first = page * page_size
+        sys.stdout.write(format_page(tasks[first:first + page_size], first,
+                                     numbered))
+        sys.stdout.flush()
+        if pages == 1:
+            return
+        while True:
+            choice = input(f"Page {page + 1} of {pages}. Enter n (next), "
+                           f"p (previous), a page number, or q to stop: "
+                           ).strip().lower()
+            if choice == "q":
+                return
+            if choice == "n" and page < pages - 1:
+                page += 1
+                break
+            if choice == "p" and page > 0:
+                page -= 1
+                break
+            if choice.isdigit() and 1 <= int(choice) <= pages:
+                page = int(choice) - 1
+                break
+            print("Invalid selection. Please try again.")
+
+
+def stream_pages(open_tasks, numbered, page_size):
+    """
+    Function that displays the tasks of an iterator one page at a time
+    (see page_tasks). One task past the page shown is read ahead to know
+    whether another page follows. Earlier pages are not kept, so moving
+    back streams the tasks again from a new iterator and skips to the
+    page, and so does jumping to a page number.
+
+    Args:
+        open_tasks (function): Returns a new iterator over the tasks
+        numbered (bool): Whether to show each task's number
+        page_size (int): The tasks per page
+    """
+    tasks = iter(open_tasks())
+    # the task read ahead, if any, and the position of the next task
+    # given, counting it
+    ahead = []
+    position = 0
+    page = 0
+    shown = None
+    while True:
+        first = page * page_size
+        if first < position:
+            tasks = iter(open_tasks())
+            ahead = []
+            position = 0
+        # skip the tasks before the page
+        skip = first - position
+        if skip and ahead:
+            ahead = []
+            skip -= 1
+        next(itertools.islice(tasks, skip, skip), None)
+        rows = ahead + list(itertools.islice(tasks,
+                                             page_size + 1 - len(ahead)))
+        ahead = rows[page_size:]
+        position = first + len(rows) - len(ahead)
+        if not rows and shown is not None:
+            print(f"There is no page {page + 1}.")
+            page = shown
+            continue
+        sys.stdout.write(format_page(rows[:page_size], first, numbered))
+        sys.stdout.flush()
+        shown = page
+        if not ahead and page == 0:
+            return
+        while True:
+            choice = input(f"Page {page + 1}. Enter n (next), p (previous), "
+                           f"a page number, or q to stop: ").strip().lower()
+            if choice == "q":
+                return
+            if choice == "n" and ahead:
+                page += 1
+                break
+            if choice == "p" and page > 0:
+                page -= 1
+                break
+            if choice.isdigit() and int(choice) >= 1:
+                page = int(choice) - 1
+                break
+            print("Invalid selection. Please try again.")
 
 
 def select_task(tasks):
@@ -529,7 +3358,6 @@ def select_task(tasks):
                     else:
                         if not tasks[select_int].is_complete():
                             modify_task(tasks[select_int])
-                            update_task_file(tasks)
                             break
                         else:
                             print("The selected task is complete and cannot be"
@@ -545,31 +3373,6 @@ def select_task(tasks):
         print(f"Error selecting task: {e}")
 
 
-def update_task_file(user_tasks):
-    """
-    Function to replace modified tasks and update the task file.
-    """
-    try:
-        tasks = get_tasks()
-        # replace modified user tasks
-        for index, task in enumerate(tasks):
-            for user_task in user_tasks:
-                if task.get_title() == user_task.get_title():
-                    tasks[index] = user_task
-
-        # update task file
-        with open("tasks.txt", "w", encoding="utf-8") as task_file:
-            for index, task in enumerate(tasks):
-                if index == 0:
-                    task_file.write(str(task))
-                else:
-                    task_file.write("\n" + str(task))
-    except IOError:
-        print("Error updating task file.")
-    except Exception as e:
-        print(f"Error updating task file: {e}")
-
-
 def modify_task(task):
     """
     Function to modify task details based on user prompted selection.
@@ -580,7 +3383,7 @@ def modify_task(task):
             selection = input("\nWould you like to:\n1. Mark task as complete\n"
                               "2. Edit the task\nEnter your selection: ")
             if selection == '1':
-                task.mark_as_complete()
+                task_store.complete(task)
                 print("Task marked as completed!")
                 break
             elif selection == '2':
@@ -596,29 +3399,32 @@ def modify_task(task):
                     print("Invalid input. Please try again.")
                 # prompt for changes, and change task details
                 if edit_user == '1':
-                    users = get_users()
+                    users = task_store.get_users()
                     while True:
                         print("Please enter the new details: ")
                         user_change = input("Assigned user: ")
                         if user_change in users:
-                            task.change_assigned(user_change)
+                            task_store.reassign(task, user_change)
                             break
                         else:
                             print("That user does not exist.")
                 if edit_date == '1':
                     print("Please enter the new details: ")
                     date_change = input("Due date (dd/mm/yyyy): ")
-                    task.change_due_date(date_change)
+                    task_store.reschedule(task, date_change)
                 break
             else:
                 print("Invalid selection. Please enter only the number.")
+    except KeyError:
+        print("This task was deleted by another user.")
     except KeyboardInterrupt:
         print("\n\nModification cancelled.")
     except Exception as e:
         print(f"Error modifying task: {e}")
 
 
-def get_tasks():
+@profiler.timed("parse: get_tasks")
+def get_tasks(filename="tasks.txt"):
     """
     Function that returns a list of task objects retrieved from the
     task file.
@@ -626,15 +3432,10 @@ def get_tasks():
     # get tasks from file, returns list of objects
     tasks = []
     try:
-        with open("tasks.txt", "r", encoding="utf-8") as tasks_file:
+        with open(filename, "r", encoding="utf-8") as tasks_file:
             for line in tasks_file:
-                clean_line = line.strip("\n")
-                detail = clean_line.split(", ")
-                due = datetime.datetime.strptime(detail[3], "%d %b %Y")
-                created = datetime.datetime.strptime(detail[4], "%d %b %Y")
-                task_object = Task(detail[0], detail[1], detail[2], due,
-                                   created, detail[5])
-                tasks.append(task_object)
+                tasks.append(parse_task(line))
+        profiler.add("tasks parsed", len(tasks))
         return tasks
     except FileNotFoundError:
         print("\nCannot find tasks.txt to access tasks.\n")
@@ -647,54 +3448,405 @@ def get_tasks():
         return []
 
 
-def task_overview():
+@profiler.timed("parse: read task file")
+def read_task_file(filename="tasks.txt"):
+    """
+    Function that returns a list of task objects read from the task file,
+    or an empty list if there is none yet. Unlike get_tasks(), a line
+    that cannot be parsed raises TaskFileError instead of being treated
+    as an empty file.
+    """
+    tasks = []
+    try:
+        with open(filename, "r", encoding="utf-8") as tasks_file:
+            for line_number, line in enumerate(tasks_file, 1):
+                try:
+                    tasks.append(parse_task(line))
+                except (ValueError, IndexError):
+                    raise TaskFileError(
+                        f"Cannot read line {line_number} of {filename}. "
+                        f"Fix or remove it to read or change tasks again.")
+    except FileNotFoundError:
+        print("\nCannot find tasks.txt to access tasks.\n")
+    profiler.add("tasks parsed", len(tasks))
+    return tasks
+
+
+def task_file_error(filename="tasks.txt"):
+    """
+    Function that returns the TaskFileError for a task file that could
+    not be read while streaming it, naming the first bad line. The file
+    is only read again once streaming has failed.
+    """
+    try:
+        read_task_file(filename)
+    except TaskFileError as e:
+        return e
+    return TaskFileError(f"Cannot read {filename}. Fix or remove the lines "
+                         f"that are not in the task format.")
+
+
+def parse_task(line):
+    """
+    Function that returns the task object for a line of the task file.
+    """
+    detail = line.strip("\n").split(", ")
+    due = parse_date(detail[3])
+    created = parse_date(detail[4])
+    # files written before task IDs have no seventh field
+    task_id = int(detail[6]) if len(detail) > 6 else None
+    return Task(detail[0], detail[1], detail[2], due, created, detail[5],
+                task_id)
+
+
+def read_archive_totals(totals_file):
+    """
+    Function that returns the archive totals: the number of archived
+    tasks of each user and the days from assignment to due date summed
+    over them, the size of the archive file they were read from and the
+    largest archived task ID. Without an archive all are empty.
+    """
+    totals = {"users": {}, "lead_days": {}, "bytes": 0, "last_id": 0}
+    try:
+        with open(totals_file, "r", encoding="utf-8") as totals_json:
+            totals.update(json.load(totals_json))
+    except FileNotFoundError:
+        pass
+    return totals
+
+
+def iter_archive(archive_file, totals_file):
+    """
+    Function that returns an iterator over the task objects in the
+    archive file, reading only the part counted in the archive totals.
+    The archive is decompressed a block at a time as the tasks are read.
+    """
+    size = read_archive_totals(totals_file)["bytes"]
+    if not size:
+        return
+    with open(archive_file, "rb") as archive:
+        # each archive run added one gzip member
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        partial = b""
+        while size > 0:
+            block = archive.read(min(size, ARCHIVE_BLOCK_BYTES))
+            if not block:
+                break
+            size -= len(block)
+            while block:
+                partial += decompressor.decompress(block)
+                block = decompressor.unused_data
+                if decompressor.eof:
+                    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            lines = partial.split(b"\n")
+            partial = lines.pop()
+            for line in lines:
+                yield parse_task(line.decode("utf-8"))
+
+
+def read_journal(journal_file):
+    """
+    Function that returns the records of a journal file grouped by task
+    ID (see parse_journal), or an empty dictionary without a journal.
+    """
+    if journal_file is None:
+        return {}
+    try:
+        with open(journal_file, "r", encoding="utf-8") as records:
+            return parse_journal(records)
+    except FileNotFoundError:
+        return {}
+
+
+def parse_journal(lines):
+    """
+    Function that returns journal records grouped by task ID, as a
+    dictionary of task ID -> list of (action, value) pairs in the order
+    they were written.
+
+    Args:
+        lines (iterable): The journal record lines
+    """
+    journal = {}
+    for line in lines:
+        record = line.strip("\n").split(", ")
+        try:
+            value = None
+            if record[0] == "reassign":
+                value = record[2]
+            elif record[0] == "due":
+                value = parse_date(record[2])
+            elif record[0] not in ("complete", "delete"):
+                raise ValueError(f"unknown action '{record[0]}'")
+            journal.setdefault(int(record[1]), []).append((record[0], value))
+        except (ValueError, IndexError):
+            # skip a record torn by an interrupted write
+            print("\nSkipping invalid journal record.\n")
+    return journal
+
+
+def replay_records(task, records):
+    """
+    Function that applies a task's journal records to it. Returns False
+    if the task was deleted.
+
+    Args:
+        task (Task): The task to update
+        records (list): The task's (action, value) journal records
+    """
+    for action, value in records:
+        if action == "complete":
+            task.mark_as_complete()
+        elif action == "reassign":
+            task.change_assigned(value)
+        elif action == "due":
+            task.due_day = value
+        elif action == "delete":
+            return False
+    return True
+
+
+def filter_tasks(tasks, user=None, completed=None, overdue=None,
+                 due_from=None, due_to=None, now=None, created_from=None,
+                 created_to=None, keywords=None):
+    """
+    Generator that yields the tasks matching every given filter. Filters
+    left as None are not applied.
+
+    Args:
+        tasks (iterable): The task objects to filter
+        user (str): Only tasks assigned to this user
+        completed (bool): Only complete (True) or incomplete (False) tasks
+        overdue (bool): Only incomplete tasks past their due date (True)
+            or tasks that are not (False)
+        due_from (datetime): Only tasks due on or after this date
+        due_to (datetime): Only tasks due on or before this date
+        now (datetime): The time overdue status is judged against,
+            defaults to the current time
+        created_from (datetime): Only tasks assigned on or after this date
+        created_to (datetime): Only tasks assigned on or before this date
+        keywords (str): Only tasks with every word of this text in their
+            title or description (see tokenize)
+    """
+    if now is None:
+        now = datetime.datetime.now()
+    first_day = day_ordinal(due_from) if due_from is not None else None
+    last_day = day_ordinal(due_to) if due_to is not None else None
+    first_created = (day_ordinal(created_from) if created_from is not None
+                     else None)
+    last_created = (day_ordinal(created_to) if created_to is not None
+                    else None)
+    words = tokenize(keywords) if keywords else None
+    for task in tasks:
+        if user is not None and task.get_assigned() != user:
+            continue
+        if completed is not None and task.is_complete() != completed:
+            continue
+        if overdue is not None and overdue != (not task.is_complete()
+                                               and task.is_overdue(now)):
+            continue
+        if first_day is not None and task.due_day < first_day:
+            continue
+        if last_day is not None and task.due_day > last_day:
+            continue
+        if first_created is not None and task.created_day < first_created:
+            continue
+        if last_created is not None and task.created_day > last_created:
+            continue
+        if words and not words <= task_tokens(task):
+            continue
+        yield task
+
+
+def iter_tasks(filename="tasks.txt", journal_file=None, **filters):
+    """
+    Generator that streams the tasks matching the given filters (see
+    filter_tasks) from the task file, with any journal edits applied.
+    Only the journal is held in memory, so memory use does not grow with
+    the size of the task file. Raises TaskFileError if a line of the task
+    file cannot be read.
+    """
+    journal = read_journal(journal_file)
+    try:
+        with TaskFile(filename) as task_file:
+            profiler.add("bytes read", len(task_file.data))
+            # skip the lines of other users or completion states unread
+            completed = filters.get("completed")
+            if completed is None and filters.get("overdue"):
+                completed = False
+            tasks = task_file.iter_tasks(journal, filters.get("user"),
+                                         completed)
+            yield from filter_tasks(tasks, **filters)
+    except FileNotFoundError:
+        print("\nCannot find tasks.txt to access tasks.\n")
+    except (ValueError, IndexError):
+        raise task_file_error(filename) from None
+
+
+@profiler.timed("parse: mapped counts")
+def file_stats(filename="tasks.txt", journal_file=None, now=None):
+    """
+    Function that returns the report counters for a task file, with any
+    journal edits applied, reading it through a memory map (see
+    TaskFile.get_stats). Raises TaskFileError if a line of the task file
+    cannot be read.
+    """
+    journal = read_journal(journal_file)
+    try:
+        with TaskFile(filename) as task_file:
+            profiler.add("bytes read", len(task_file.data))
+            stats = task_file.get_stats(journal, now)
+            profiler.add("tasks scanned", stats.total)
+            return stats
+    except FileNotFoundError:
+        print("\nCannot find tasks.txt to access tasks.\n")
+    except (ValueError, IndexError):
+        raise task_file_error(filename) from None
+    return TaskStats([], now)
+
+
+def chunk_ranges(filename, chunks):
+    """
+    Function that splits a file into about the given number of byte
+    ranges, each ending at a line boundary. Returns a list of
+    (start, end) byte offsets.
+    """
+    size = os.path.getsize(filename)
+    bounds = [0]
+    with open(filename, "rb") as split_file:
+        for number in range(1, chunks):
+            split_file.seek(max(size * number // chunks, bounds[-1]))
+            # move to the start of the next line
+            split_file.readline()
+            bounds.append(min(split_file.tell(), size))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:])
+            if end > start]
+
+
+def count_chunk(filename, start, end, journal, now):
+    """
+    Function run by each parallel report worker. It counts the tasks on
+    the lines between two byte offsets of the task file, with their
+    journal records applied, and returns the per-user counters.
+
+    Args:
+        filename (str): The task file
+        start (int): The offset of the first line
+        end (int): The offset just after the last line
+        journal (dict): The journal records, as returned by read_journal
+        now (datetime): The time overdue status is judged against
+    """
+    stats = TaskStats([], now)
+    with open(filename, "rb") as tasks_file:
+        tasks_file.seek(start)
+        position = start
+        while position < end:
+            line = tasks_file.readline()
+            position += len(line)
+            task = parse_task(line.decode("utf-8"))
+            if task.get_id() is None:
+                raise ValueError("the task file has lines without IDs")
+            if replay_records(task, journal.get(task.get_id(), ())):
+                stats.count(task, 1)
+    return stats.users
+
+
+@profiler.timed("parse: parallel counts")
+def parallel_stats(filename="tasks.txt", journal_file=None, workers=None,
+                   now=None):
+    """
+    Function that counts the report totals of a task file with a pool of
+    worker processes. The file is split into line-aligned byte ranges,
+    each worker counts whole ranges and the partial counters are merged,
+    so the result is the same as counting the file in one pass. Raises
+    ValueError if a line cannot be counted on its own.
+
+    Args:
+        filename (str): The task file
+        journal_file (str): The journal file, or None
+        workers (int): The number of processes, defaults to one per CPU
+        now (datetime): The time overdue status is judged against,
+            defaults to the current time
+    """
+    stats = TaskStats([], now)
+    journal = read_journal(journal_file)
+    if not os.path.exists(filename):
+        return stats
+    workers = workers or os.cpu_count() or 1
+    # several ranges per worker keep them all busy until the end
+    chunks = max(workers, os.path.getsize(filename) // REPORT_CHUNK_BYTES)
+    ranges = chunk_ranges(filename, chunks)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = pool.map(count_chunk, [filename] * len(ranges),
+                            *zip(*ranges), [journal] * len(ranges),
+                            [stats.now] * len(ranges))
+        for users in partials:
+            for user, counts in users.items():
+                stats.add_counts(user, *counts)
+    profiler.add("bytes read", os.path.getsize(filename))
+    profiler.add("tasks scanned", stats.total)
+    return stats
+
+
+@profiler.timed("report: task overview")
+def task_overview(batch=None, stats=None):
     """
     Function that retrieves and calculates task statistics, then saves
-    the details onto a file.
+    the details onto a file. Returns the text of the file, or None if
+    it could not be generated.
+
+    Args:
+        batch (AtomicBatch): A batch to add the file write to, instead of
+            writing it straight away
+        stats (TaskStats): The counters to report, defaults to the task
+            store's
     """
     try:
-        # set defaults and get necessary details
-        tasks = get_tasks()
-        total_tasks = len(tasks)
-        completed_tasks = 0
-        incomplete_tasks = 0
-        overdue = 0
-        # count specific tasks
-        for task in tasks:
-            if not task.is_complete():
-                incomplete_tasks += 1
-                if task.is_overdue():
-                    overdue += 1
-            else:
-                completed_tasks += 1
+        # get the task counters
+        if stats is None:
+            stats = task_store.get_stats()
+        total_tasks = stats.total
+        completed_tasks = stats.completed
+        incomplete_tasks = stats.total - stats.completed
+        overdue = stats.overdue
         # calculate task percentages
         incomplete_percentage = round(((incomplete_tasks/total_tasks)*100), 2) if total_tasks > 0 else 0
         overdue_percentage = round(((overdue/total_tasks)*100), 2) if total_tasks > 0 else 0
         # write to task overview file
         overview_details = [total_tasks, completed_tasks, incomplete_tasks,
                             overdue, incomplete_percentage, overdue_percentage]
-        with open("task_overview.txt", "w", encoding="utf-8") as task_overview:
-            for index, detail in enumerate(overview_details):
-                if index == 0:
-                    task_overview.write(str(detail))
-                else:
-                    task_overview.write("\n" + str(detail))
+        overview_text = "\n".join(str(detail) for detail in overview_details)
+        if batch is None:
+            atomic_write("task_overview.txt", overview_text)
+        else:
+            batch.write("task_overview.txt", overview_text)
+        return overview_text
     except IOError:
         print("Error writing task overview file.")
     except Exception as e:
         print(f"Error generating task overview: {e}")
 
 
-def user_overview():
+@profiler.timed("report: user overview")
+def user_overview(batch=None, stats=None):
     """
     Function that retrieves and calculates user statistics, then saves
-    the details onto a file.
+    the details onto a file. Returns the text of the file, or None if
+    it could not be generated.
+
+    Args:
+        batch (AtomicBatch): A batch to add the file write to, instead of
+            writing it straight away
+        stats (TaskStats): The counters to report, defaults to the task
+            store's
     """
     try:
         # set defaults and get necessary details
-        tasks = get_tasks()
-        total_tasks = len(tasks)
-        users_dict = get_users()
+        if stats is None:
+            stats = task_store.get_stats()
+        total_tasks = stats.total
+        users_dict = task_store.get_users()
         if users_dict is None:
             return
         users = list(users_dict.keys())
@@ -702,22 +3854,10 @@ def user_overview():
         user_count = 0
         # count specific details per user
         for user in users:
-            # Set user defaults
-            user_tasks = 0
-            user_completed = 0
-            incomplete = 0
-            user_overdue = 0
+            # get user counters
+            user_tasks, user_completed, user_overdue = stats.get_user(user)
+            incomplete = user_tasks - user_completed
             user_count += 1
-            for task in tasks:
-                # count user details
-                if task.get_assigned() == user:
-                    user_tasks += 1
-                    if task.is_complete():
-                        user_completed += 1
-                    else:
-                        incomplete += 1
-                        if task.is_overdue():
-                            user_overdue += 1
             # calculate percentages
             task_percentage = round(((user_tasks/total_tasks)*100), 2) if total_tasks > 0 else 0
             if user_tasks == 0:
@@ -734,17 +3874,144 @@ def user_overview():
                        str(overdue_percentage)]
             user_details.append(details)
         # write to user overview file
-        with open("user_overview.txt", "w", encoding="utf-8") as overview:
-            overview.write(str(user_count))
-            overview.write("\n" + str(total_tasks))
-            for detail in user_details:
-                overview.write("\n" + ", ".join(detail))
+        overview_lines = [str(user_count), str(total_tasks)]
+        for detail in user_details:
+            overview_lines.append(", ".join(detail))
+        overview_text = "\n".join(overview_lines)
+        if batch is None:
+            atomic_write("user_overview.txt", overview_text)
+        else:
+            batch.write("user_overview.txt", overview_text)
+        return overview_text
     except IOError:
         print("Error writing user overview file.")
     except Exception as e:
         print(f"Error generating user overview: {e}")
 
 
+def history_snapshot(stats):
+    """
+    Function that returns the report counters as a report history
+    snapshot, a dictionary with the date first.
+    """
+    return {"date": stats.now.date().isoformat(), "total": stats.total,
+            "completed": stats.completed, "overdue": stats.overdue,
+            "lead_days": stats.lead_days, "users": stats.users}
+
+
+def record_snapshot(stats, filename=None):
+    """
+    Function that appends the report counters to the report history
+    file as one line of JSON, replacing the line for the same day if the
+    reports were already generated that day. Callers hold the store
+    lock, so sessions do not interleave their writes.
+
+    Args:
+        stats (TaskStats): The counters to record
+        filename (str): The history file, defaults to REPORT_HISTORY_FILE
+    """
+    if filename is None:
+        filename = REPORT_HISTORY_FILE
+    # the date comes first, so today's line can be recognised by its start
+    prefix = f'{{"date":"{stats.now.date().isoformat()}"'
+    line = json.dumps(history_snapshot(stats), separators=(",", ":")) + "\n"
+    try:
+        with open(filename, "a+b") as history:
+            start = last_line_start(history)
+            history.seek(start)
+            if history.read(len(prefix)) == prefix.encode("utf-8"):
+                history.truncate(start)
+            history.write(line.encode("utf-8"))
+    except IOError:
+        print("Error writing report history file.")
+
+
+def last_line_start(history):
+    """
+    Function that returns the offset of the last line of a file opened in
+    binary mode, reading backwards from the end a block at a time.
+    """
+    position = history.seek(0, os.SEEK_END) - 1
+    while position > 0:
+        block_start = max(0, position - 4096)
+        history.seek(block_start)
+        newline = history.read(position - block_start).rfind(b"\n")
+        if newline >= 0:
+            return block_start + newline + 1
+        position = block_start
+    return 0
+
+
+def read_history(filename=None):
+    """
+    Function that returns the daily snapshots in the report history file
+    as a list of dictionaries, oldest first. Lines that cannot be read,
+    such as one cut short by a crash, are skipped.
+    """
+    if filename is None:
+        filename = REPORT_HISTORY_FILE
+    snapshots = []
+    try:
+        with open(filename, "r", encoding="utf-8") as history:
+            for line in history:
+                try:
+                    snapshots.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return snapshots
+
+
+@profiler.timed("report: trend overview")
+def trend_overview(batch=None, snapshots=None):
+    """
+    Function that calculates the trends of the last TREND_DAYS daily
+    snapshots, then saves them onto a file. Each line has the date, total
+    and completed tasks, tasks completed per day since the snapshot
+    before, the overdue percentage and the average days from assignment
+    to due date. Returns the text of the file, or None if it could not be
+    generated.
+
+    Args:
+        batch (AtomicBatch): A batch to add the file write to, instead of
+            writing it straight away
+        snapshots (list): The snapshots, defaults to the report history
+    """
+    try:
+        if snapshots is None:
+            snapshots = read_history()
+        lines = []
+        previous = None
+        for snapshot in snapshots:
+            total = snapshot["total"]
+            completed = snapshot["completed"]
+            overdue = snapshot["overdue"]
+            lead_days = snapshot["lead_days"]
+            day = datetime.date.fromisoformat(snapshot["date"]).toordinal()
+            # completion velocity, unknown for the first snapshot
+            velocity = ""
+            if previous is not None and day > previous[0]:
+                velocity = round((completed - previous[1])
+                                 / (day - previous[0]), 2)
+            overdue_percentage = round(((overdue/total)*100), 2) if total > 0 else 0
+            average_lead = round(lead_days/total, 1) if total > 0 else 0
+            lines.append(", ".join(str(detail) for detail in (
+                snapshot["date"], total, completed, velocity,
+                overdue_percentage, average_lead)))
+            previous = (day, completed)
+        overview_text = "\n".join(lines[-TREND_DAYS:])
+        if batch is None:
+            atomic_write("trend_overview.txt", overview_text)
+        else:
+            batch.write("trend_overview.txt", overview_text)
+        return overview_text
+    except IOError:
+        print("Error writing trend overview file.")
+    except Exception as e:
+        print(f"Error generating trend overview: {e}")
+
+
 # ===== Main Menus =====
 def main_menu(current_user):
     """
@@ -759,6 +4026,7 @@ def main_menu(current_user):
 a - add task
 va - view all tasks
 vm - view my tasks
+s - search tasks
 l - log out
 e - exit
 : '''
@@ -773,6 +4041,9 @@ e - exit
             elif menu == 'vm':
                 view_mine(current_user)
 
+            elif menu == 's':
+                search()
+
             elif menu == 'l':
                 print("Logged out successfully.\n")
                 break
@@ -805,8 +4076,11 @@ r - register user
 a - add task
 va - view all tasks
 vm - view my tasks
+s - search tasks
 vc - view completed tasks
 del - delete tasks
+b - bulk edit tasks
+ar - archive completed tasks
 ds - display statistics
 gr - generate report
 l - log out
@@ -826,12 +4100,21 @@ e - exit
             elif menu == 'vm':
                 view_mine(current_user)
 
+            elif menu == 's':
+                search()
+
             elif menu == 'vc':
                 view_completed()
 
             elif menu == 'del':
                 delete_task()
 
+            elif menu == 'b':
+                bulk_edit()
+
+            elif menu == 'ar':
+                archive_tasks()
+
             elif menu == 'ds':
                 display_statistics()
 
@@ -855,7 +4138,411 @@ e - exit
             print(f"An unexpected error occurred in admin menu: {e}")
 
 
+def migrate_to_sqlite(database="tasks.db", tasks_file="tasks.txt",
+                      journal_file="tasks_journal.txt", user_file="user.txt"):
+    """
+    Function that imports the users and tasks, archived ones included,
+    from the text files into a SQLite database, keeping the task IDs.
+    """
+    source = TaskStore(tasks_file, journal_file, user_file=user_file)
+    users = source.get_users()
+    if users is None:
+        return
+    target = SqliteStore(database)
+    rows = [(task.get_id(), task.user, task.title, task.description,
+             task.due_day, task.created_day, int(task.completed))
+            for task in [*source.iter_tasks(), *source.iter_archived()]]
+    with target.connection:
+        target.connection.executemany(
+            "INSERT OR REPLACE INTO users (name, password) VALUES (?, ?)",
+            users.items())
+        target.connection.executemany(
+            "INSERT OR REPLACE INTO tasks (id, user, title, description, "
+            "due_day, created_day, completed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows)
+    print(f"Imported {len(users)} users and {len(rows)} tasks into "
+          f"{database}.")
+
+
+def open_store():
+    """
+    Function that returns the storage backend for the session: the SQLite
+    database named by the TASK_MANAGER_DB environment variable if it is
+    set, otherwise the text files.
+    """
+    database = os.environ.get("TASK_MANAGER_DB")
+    if database:
+        return SqliteStore(database)
+    return TaskStore("tasks.txt", "tasks_journal.txt", user_file="user.txt",
+                     archive_days=ARCHIVE_DAYS)
+
+
+# ===== Batch Commands =====
+# the columns of batch import and export files
+BATCH_FIELDS = ["id", "user", "title", "description", "due_date",
+                "date_assigned", "completed"]
+
+
+def batch_format(filename, file_format):
+    """
+    Function that returns the batch file format, guessing it from the
+    file extension if it was not given.
+    """
+    if file_format is not None:
+        return file_format
+    if filename.endswith((".jsonl", ".json")):
+        return "jsonl"
+    return "csv"
+
+
+def read_batch_rows(filename, file_format):
+    """
+    Generator that reads a CSV file (with a header row) or a JSONL file
+    one record at a time, yielding (line number, row dictionary) pairs.
+    The row is None for a line that is not valid JSON.
+    """
+    with open(filename, "r", encoding="utf-8", newline="") as batch_file:
+        if file_format == "csv":
+            reader = csv.DictReader(batch_file)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(batch_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError:
+                    yield line_number, None
+
+
+def task_from_row(row, users):
+    """
+    Function that returns a new task object for a batch import row,
+    raising ValueError if the row is not valid.
+
+    Args:
+        row (dict): The row, with the BATCH_FIELDS columns (the ID is
+            ignored and the assigned date defaults to today)
+        users (dict): The known users
+    """
+    if not isinstance(row, dict):
+        raise ValueError("not a valid record")
+    user = str(row.get("user") or "").strip()
+    if user not in users:
+        raise ValueError(f"unknown user '{user}'")
+    title = str(row.get("title") or "").strip()
+    if not title:
+        raise ValueError("missing title")
+    description = str(row.get("description") or "").strip()
+    try:
+        due = parse_date(str(row.get("due_date") or "").strip())
+        if row.get("date_assigned"):
+            created = parse_date(str(row["date_assigned"]).strip())
+        else:
+            created = datetime.date.today().toordinal()
+    except (ValueError, IndexError):
+        raise ValueError("invalid date, use dd/mm/yyyy or yyyy-mm-dd")
+    completed = str(row.get("completed") or "No").strip().lower()
+    task = Task(user, title, description, due, created,
+                completed in ("yes", "true", "1"))
+    problem = task_store.check_task(task)
+    if problem is not None:
+        raise ValueError(problem)
+    return task
+
+
+def read_task_ids(args):
+    """
+    Function that returns the task IDs given on the command line and in
+    the --input file (one per line).
+    """
+    task_ids = list(args.ids)
+    if args.input is not None:
+        with open(args.input, "r", encoding="utf-8") as id_file:
+            task_ids.extend(int(line) for line in id_file if line.strip())
+    return task_ids
+
+
+def get_batch_tasks(task_ids):
+    """
+    Function that returns the stored tasks for the given IDs, or None
+    after reporting any IDs that do not exist.
+    """
+    tasks = []
+    missing = []
+    for task_id in task_ids:
+        try:
+            tasks.append(task_store.get(task_id))
+        except KeyError:
+            missing.append(str(task_id))
+    if missing:
+        print(f"No tasks with ID: {', '.join(missing)}. Nothing was changed.")
+        return None
+    return tasks
+
+
+def batch_import(args):
+    """
+    Function that imports tasks from a CSV or JSONL file. Every row is
+    validated first, and the tasks are only stored, in one write, if all
+    of them are valid.
+    """
+    users = task_store.get_users()
+    if users is None:
+        return 1
+    tasks = []
+    errors = 0
+    file_format = batch_format(args.file, args.format)
+    for line_number, row in read_batch_rows(args.file, file_format):
+        try:
+            tasks.append(task_from_row(row, users))
+        except ValueError as e:
+            print(f"Line {line_number}: {e}")
+            errors += 1
+    if errors > 0:
+        print(f"{errors} invalid rows. No tasks were imported.")
+        return 1
+    task_store.add_many(tasks)
+    print(f"Imported {len(tasks)} tasks.")
+    return 0
+
+
+def batch_export(args):
+    """
+    Function that exports the tasks matching the filters to a CSV or
+    JSONL file, or to standard output.
+    """
+    file_format = batch_format(args.output, args.format)
+    if args.output == "-":
+        output = sys.stdout
+    else:
+        output = open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        writer = csv.writer(output)
+        if file_format == "csv":
+            writer.writerow(BATCH_FIELDS)
+        for task in task_store.iter_tasks(user=args.user,
+                                          completed=args.completed,
+                                          overdue=args.overdue):
+            values = [task.get_id(), task.user, task.title, task.description,
+                      date_str(task.due), date_str(task.date_created),
+                      task.completion]
+            if file_format == "csv":
+                writer.writerow(values)
+            else:
+                output.write(json.dumps(dict(zip(BATCH_FIELDS, values)))
+                             + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def batch_complete(args):
+    """
+    Function that marks the given tasks as complete in one write.
+    """
+    tasks = get_batch_tasks(read_task_ids(args))
+    if tasks is None:
+        return 1
+    task_store.edit_many([("complete", task, None) for task in tasks])
+    print(f"Marked {len(tasks)} tasks as complete.")
+    return 0
+
+
+def batch_reassign(args):
+    """
+    Function that assigns the given tasks to another user in one write.
+    """
+    users = task_store.get_users()
+    if users is None:
+        return 1
+    if args.user not in users:
+        print(f"That username does not exist: {args.user}")
+        return 1
+    tasks = get_batch_tasks(read_task_ids(args))
+    if tasks is None:
+        return 1
+    task_store.edit_many([("reassign", task, args.user) for task in tasks])
+    print(f"Reassigned {len(tasks)} tasks to {args.user}.")
+    return 0
+
+
+def batch_archive(args):
+    """
+    Function that moves old completed tasks into the archive.
+    """
+    try:
+        count = task_store.archive(args.days)
+    except NotImplementedError:
+        print("Archiving is only available with the text task files.")
+        return 1
+    print(f"Archived {count} tasks.")
+    return 0
+
+
+def batch_remind(args):
+    """
+    Function that writes a digest of overdue and due soon tasks for each
+    user, then, unless run once, keeps running and writes a digest for
+    each user with new reminders when the next reminder is due.
+    """
+    reminders = task_store.get_reminders(args.days)
+    try:
+        while True:
+            now = datetime.datetime.now()
+            reminders.advance(now)
+            text = "".join(format_digest(user, overdue, soon, now)
+                           for user, (overdue, soon)
+                           in reminders.take_digests().items()
+                           if overdue or soon)
+            if args.output == "-":
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            elif text:
+                with open(args.output, "a", encoding="utf-8") as output:
+                    output.write(text)
+            if args.once:
+                return 0
+            # sleep until the next reminder, but wake up in between to
+            # pick up tasks changed by other sessions
+            wait = args.poll
+            wake = reminders.next_wake()
+            if wake is not None:
+                wait = min(wait, max(1, (wake - now).total_seconds()))
+            time.sleep(wait)
+            latest = task_store.get_reminders(args.days)
+            if latest is not reminders:
+                # backends without a kept queue build a new one each
+                # time, so only report the users whose reminders changed
+                latest.follow(reminders)
+            reminders = latest
+    except KeyboardInterrupt:
+        print("\nReminders stopped.")
+        return 0
+
+
+def batch_report(args):
+    """
+    Function that generates and displays the reports.
+    """
+    # unlike the menu, a task file that cannot be read ends the command
+    write_reports(args.workers, verbose=True)
+    print("Reports generated.")
+    display_statistics()
+    return 0
+
+
+def batch_migrate(args):
+    """
+    Function that imports the text files into a SQLite database.
+    """
+    migrate_to_sqlite(args.database)
+    return 0
+
+
+def run_batch(argv):
+    """
+    Function that runs a non-interactive command given on the command
+    line and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(
+        prog="task_manager.py",
+        description="Run task manager operations without the menus. "
+                    "Run with no arguments for the interactive program.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser(
+        "import", help="import tasks from a CSV or JSONL file")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"])
+    import_parser.set_defaults(run=batch_import)
+
+    export_parser = commands.add_parser(
+        "export", help="export tasks to a CSV or JSONL file")
+    export_parser.add_argument("-o", "--output", default="-",
+                               help="output file (default: standard output)")
+    export_parser.add_argument("--format", choices=["csv", "jsonl"])
+    export_parser.add_argument("--user")
+    export_parser.add_argument("--completed", action="store_true",
+                               default=None)
+    export_parser.add_argument("--incomplete", action="store_false",
+                               dest="completed")
+    export_parser.add_argument("--overdue", action="store_true",
+                               default=None)
+    export_parser.set_defaults(run=batch_export)
+
+    complete_parser = commands.add_parser(
+        "complete", help="mark tasks as complete")
+    complete_parser.add_argument("ids", nargs="*", type=int)
+    complete_parser.add_argument("--input",
+                                 help="file with one task ID per line")
+    complete_parser.set_defaults(run=batch_complete)
+
+    reassign_parser = commands.add_parser(
+        "reassign", help="assign tasks to another user")
+    reassign_parser.add_argument("user")
+    reassign_parser.add_argument("ids", nargs="*", type=int)
+    reassign_parser.add_argument("--input",
+                                 help="file with one task ID per line")
+    reassign_parser.set_defaults(run=batch_reassign)
+
+    archive_parser = commands.add_parser(
+        "archive", help="move old completed tasks into the archive")
+    archive_parser.add_argument(
+        "days", type=int,
+        help="archive completed tasks due more than this many days ago")
+    archive_parser.set_defaults(run=batch_archive)
+
+    remind_parser = commands.add_parser(
+        "remind", help="write digests of overdue and due soon tasks as "
+                       "they fall due")
+    remind_parser.add_argument("-o", "--output", default="-",
+                               help="file the digests are appended to "
+                                    "(default: standard output)")
+    remind_parser.add_argument("--days", type=int, default=REMINDER_DAYS,
+                               help="list tasks due within this many days "
+                                    "as due soon")
+    remind_parser.add_argument("--poll", type=float,
+                               default=REMINDER_POLL_SECONDS,
+                               help="seconds between checks for tasks "
+                                    "changed by other sessions")
+    remind_parser.add_argument("--once", action="store_true",
+                               help="write the current digests and exit")
+    remind_parser.set_defaults(run=batch_remind)
+
+    report_parser = commands.add_parser(
+        "report", help="generate and display the reports")
+    report_parser.add_argument(
+        "--workers", type=int,
+        help="count the task file with this many processes")
+    report_parser.set_defaults(run=batch_report)
+
+    migrate_parser = commands.add_parser(
+        "migrate", help="import the text files into a SQLite database")
+    migrate_parser.add_argument("database", nargs="?", default="tasks.db")
+    migrate_parser.set_defaults(run=batch_migrate)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.run(args)
+    except TaskFileError as e:
+        print(e)
+    except FileNotFoundError as e:
+        print(f"Cannot find file '{e.filename}'.")
+    except ValueError as e:
+        print(f"Invalid input: {e}")
+    except IOError as e:
+        print(f"Error reading or writing a file: {e}")
+    return 1
+
+
 # ===== Main Program =====
+# the storage shared by every menu action in this session
+task_store = open_store()
+
+
 def main():
     """
     Main program function with error handling.
@@ -875,4 +4562,12 @@ def main():
 
 
 if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    for argument in list(arguments):
+        # --profile[=outputs] works with the menus and every command
+        if argument == "--profile" or argument.startswith("--profile="):
+            arguments.remove(argument)
+            profiler.start(argument.partition("=")[2] or "summary")
+    if len(arguments) > 0:
+        sys.exit(run_batch(arguments))
     main()
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Tests of the text task store shared by several sessions. Run from the
+repository root with
+
+    python -m unittest discover tests
+"""
+# ===== Importing external modules ===========
+import datetime
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+import task_manager
+
+
+def new_task(title, user="admin"):
+    """
+    Function that returns a new task object with fixed dates.
+    """
+    return task_manager.Task(user, title, "Test task",
+                             datetime.datetime(2030, 1, 1),
+                             datetime.datetime(2025, 1, 1), "No")
+
+
+def open_store(directory):
+    """
+    Function that returns a store on the task files in a directory, with
+    a small journal so edits are compacted along the way.
+    """
+    return task_manager.TaskStore(
+        os.path.join(directory, "tasks.txt"),
+        os.path.join(directory, "tasks_journal.txt"), compact_threshold=64)
+
+
+def edit_tasks(directory, writer, count):
+    """
+    Function run by each process of the multi-process test. It adds
+    tasks one write at a time, reassigns each to its own user, completes
+    every second one and deletes every fifth.
+    """
+    store = open_store(directory)
+    for number in range(count):
+        task = new_task(f"writer {writer} task {number}")
+        store.add(task)
+        store.reassign(task, f"user{writer}")
+        if number % 2 == 0:
+            store.complete(task)
+        if number % 5 == 4:
+            store.delete(task)
+
+
+class SharedStoreTest(unittest.TestCase):
+    """
+    Two stores on the same files, as two sessions of the program would
+    have, with a small journal so edits are compacted along the way.
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "tasks.txt")
+        open(self.filename, "w", encoding="utf-8").close()
+        self.first = self.open_store()
+        self.second = self.open_store()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open_store(self):
+        return task_manager.TaskStore(
+            self.filename, os.path.join(self.directory.name,
+                                        "tasks_journal.txt"),
+            compact_threshold=64)
+
+    def test_edits_from_both_stores_survive(self):
+        for number in range(20):
+            store = self.first if number % 2 == 0 else self.second
+            store.add(new_task(f"task {number}"))
+        for number in range(20):
+            store = self.second if number % 2 == 0 else self.first
+            task = next(task for task in store.get_all()
+                        if task.title == f"task {number}")
+            if number % 3 == 0:
+                store.complete(task)
+            if number % 4 == 0:
+                store.reassign(task, "zoe")
+            if number % 5 == 4:
+                store.delete(task)
+
+        for store in (self.first, self.second, self.open_store()):
+            tasks = {task.title: task for task in store.get_all()}
+            for number in range(20):
+                task = tasks.get(f"task {number}")
+                if number % 5 == 4:
+                    self.assertIsNone(task)
+                    continue
+                self.assertEqual(task.is_complete(), number % 3 == 0)
+                self.assertEqual(task.get_assigned(),
+                                 "zoe" if number % 4 == 0 else "admin")
+        # the journal was folded into the task file at least once
+        self.assertGreater(self.first.version[1], 0)
+
+    def test_ids_stay_unique_after_compaction(self):
+        self.first.add_many([new_task(f"task {number}")
+                             for number in range(5)])
+        deleted = self.first.get_all()[-1]
+        self.second.delete(self.second.get(deleted.get_id()))
+        self.second.compact()
+        self.first.add(new_task("after compaction"))
+        self.open_store().add(new_task("from a new session"))
+
+        ids = [task.get_id() for task in self.second.get_all()]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertNotIn(deleted.get_id(), ids)
+        with self.assertRaises(KeyError):
+            self.first.complete(deleted)
+
+
+class ProcessesTest(unittest.TestCase):
+    """
+    Several processes writing to the same store at once, as sessions of
+    the program or server workers on one machine would.
+    """
+    writers = 4
+    count = 15
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        open(os.path.join(self.directory.name, "tasks.txt"), "w",
+             encoding="utf-8").close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_no_edit_is_lost(self):
+        processes = [multiprocessing.Process(
+            target=edit_tasks, args=(self.directory.name, writer, self.count))
+            for writer in range(self.writers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual([process.exitcode for process in processes],
+                         [0] * self.writers)
+
+        store = open_store(self.directory.name)
+        tasks = store.get_all()
+        ids = [task.get_id() for task in tasks]
+        self.assertEqual(len(ids), len(set(ids)))
+        by_title = {task.title: task for task in tasks}
+        self.assertEqual(len(by_title), len(tasks))
+        for writer in range(self.writers):
+            for number in range(self.count):
+                task = by_title.get(f"writer {writer} task {number}")
+                if number % 5 == 4:
+                    self.assertIsNone(task)
+                    continue
+                self.assertEqual(task.get_assigned(), f"user{writer}")
+                self.assertEqual(task.is_complete(), number % 2 == 0)
+        # each add took the next ID once, deleted tasks included
+        self.assertEqual(store.next_id, self.writers * self.count + 1)
+
+
+class BadLineTest(unittest.TestCase):
+    """
+    A task file with a line that cannot be parsed, read without loading
+    it into a store.
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "tasks.txt")
+        with open(self.filename, "w", encoding="utf-8") as tasks_file:
+            tasks_file.write("\n".join([str(new_task("first")),
+                                        "admin, not a task",
+                                        str(new_task("last"))]))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_streaming_raises_instead_of_stopping(self):
+        with self.assertRaisesRegex(task_manager.TaskFileError, "line 2"):
+            list(task_manager.iter_tasks(self.filename))
+
+    def test_counting_raises_instead_of_returning_zeros(self):
+        with self.assertRaisesRegex(task_manager.TaskFileError, "line 2"):
+            task_manager.file_stats(self.filename)
+
+
+if __name__ == "__main__":
+    unittest.main()